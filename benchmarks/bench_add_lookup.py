@@ -0,0 +1,51 @@
+"""Add/lookup latency of VocabularyDB at growing dictionary sizes.
+
+With the UNIQUE index on dict.english both numbers should stay flat
+(logarithmic) from 1k to 1M rows instead of growing linearly.
+
+    python benchmarks/bench_add_lookup.py [--sizes 1000 100000 1000000]
+"""
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import VocabularyDB, build_db, measure, summarize, synthetic_words
+
+
+def run(size: int, ops: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_db(path, size)
+        with VocabularyDB(str(path)) as db:
+            with db.get_connection() as conn:
+                existing = [row["english"] for row in conn.execute(
+                    "SELECT english FROM dict ORDER BY random() LIMIT ?",
+                    (ops,))]
+            # A different seed gives (almost only) words not yet in the table
+            fresh = iter(list(synthetic_words(ops, seed=size + 1)))
+
+            add = summarize(measure(lambda: db.add_word(*next(fresh)), ops))
+            words = iter(existing * 2)
+            lookup = summarize(measure(lambda: db.get_word(next(words)), ops))
+            dup = iter(existing)
+            duplicate = summarize(measure(lambda: db.add_word(next(dup), "x"), ops))
+
+    print(f"{size:>9} | add {add['median_us']:8.1f} us (p95 {add['p95_us']:8.1f})"
+          f" | lookup {lookup['median_us']:7.1f} us (p95 {lookup['p95_us']:7.1f})"
+          f" | duplicate {duplicate['median_us']:7.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=500)
+    args = parser.parse_args()
+
+    print("Median/p95 latency per call")
+    for size in args.sizes:
+        run(size, args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""`eng --ai-backfill` throughput against a local stub of the Gemini API.
+
+The stub answers every request after --latency ms and rate limits a share
+of them (429 with Retry-After: 0), so the numbers show what concurrency
+and retries buy without calling the real API.
+
+    python benchmarks/bench_backfill.py [--rows 300] [--latency 200]
+"""
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import SOURCE_DIR, VocabularyDB, build_db
+
+
+def make_handler(latency: float, reject: float):
+    rng = random.Random(0)
+    lock = threading.Lock()
+    counts = {"requests": 0, "rejected": 0}
+
+    class Stub(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["contents"][0]["parts"][0]["text"]
+            word = prompt.split("'")[1]
+            with lock:
+                counts["requests"] += 1
+                rejected = rng.random() < reject
+                counts["rejected"] += rejected
+            threading.Event().wait(latency)
+            if rejected:
+                payload, status = b"{}", 429
+            else:
+                payload = json.dumps({"candidates": [{"content": {"parts": [
+                    {"text": f"A sentence with {word}."}]}}]}).encode()
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            if rejected:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Stub, counts
+
+
+def run(rows: int, workers: int, latency: float, reject: float,
+        rate: float) -> None:
+    handler, counts = make_handler(latency, reject)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        build_db(db_path, rows, context_ratio=0.0)
+        config = Path(tmp) / "config.json"
+        config.write_text(json.dumps({
+            "GOOGLE_GEMINI_API_KEY": "stub",
+            "AI_BACKFILL_RATE": rate,
+        }))
+        env = dict(os.environ, ENG_DB_PATH=str(db_path),
+                   ENG_CONFIG_PATH=str(config),
+                   ENG_GEMINI_URL=f"http://127.0.0.1:{server.server_port}/")
+        out = subprocess.run(
+            [sys.executable, str(SOURCE_DIR / "main.py"), "--ai-backfill",
+             "--workers", str(workers)],
+            env=env, capture_output=True, text=True).stdout
+        with VocabularyDB(str(db_path)) as db:
+            left = db.count_missing_context().data
+    server.shutdown()
+    summary = re.sub(r"\x1b\[[0-9;]*m", "", out.strip().splitlines()[-1])
+    print(f"workers {workers:2}: {summary}; {counts['requests']} requests, "
+          f"{counts['rejected']} rate limited, {left} words left empty")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=200,
+                        help="stub answer time, ms")
+    parser.add_argument("--reject", type=float, default=0.05,
+                        help="share of requests answered with 429")
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="AI_BACKFILL_RATE, requests per second")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        run(args.rows, workers, args.latency / 1000, args.reject, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""`eng --batch` versus one `eng` process per command.
+
+Edits --edits existing words (`-e WORD -t NEW`) of a synthetic
+dictionary. The batch runs them in one process and one transaction (or
+commits every --commit-every commands); the per-process cost is measured
+on --sample commands and extrapolated.
+
+    python benchmarks/bench_batch.py [--rows 100000] [--edits 10000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from common import SOURCE_DIR, VocabularyDB, build_db
+
+MAIN = SOURCE_DIR / "main.py"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=10_000)
+    parser.add_argument("--sample", type=int, default=30)
+    parser.add_argument("--commit-every", type=int, nargs="*",
+                        default=[0, 1000, 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        build_db(db_path, args.rows)
+        with VocabularyDB(str(db_path)) as db:
+            with db.get_connection() as conn:
+                words = [row[0] for row in conn.execute(
+                    "SELECT english FROM dict ORDER BY random() LIMIT ?",
+                    (args.edits,))]
+        script = Path(tmp) / "edits.txt"
+        script.write_text("".join(f"-e {word} -t правка{i}\n"
+                                  for i, word in enumerate(words)),
+                          encoding="utf-8")
+        env = dict(os.environ, ENG_DB_PATH=str(db_path),
+                   ENG_CONFIG_PATH=str(Path(tmp) / "config.json"),
+                   ENG_DAEMON="0")
+
+        # Read the whole database once, so the first timed run is not
+        # the one that warms the OS page cache
+        subprocess.run([sys.executable, str(MAIN), "-l"], env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+
+        started = time.perf_counter()
+        for word in words[:args.sample]:
+            subprocess.run([sys.executable, str(MAIN), "-e", word, "-t", "x"],
+                           env=env, stdout=subprocess.DEVNULL, check=True)
+        per_process = (time.perf_counter() - started) / args.sample
+        print(f"{args.edits} edits, one process each: "
+              f"~{per_process * args.edits:.1f}s (extrapolated)")
+
+        for every in args.commit_every:
+            extra = ["--commit-every", str(every)] if every else []
+            started = time.perf_counter()
+            subprocess.run([sys.executable, str(MAIN), "--batch", str(script)]
+                           + extra, env=env, stdout=subprocess.DEVNULL,
+                           check=True)
+            elapsed = time.perf_counter() - started
+            label = f"commit every {every}" if every else "one transaction"
+            print(f"{args.edits} edits, --batch, {label}: {elapsed:.2f}s "
+                  f"({args.edits / elapsed:,.0f} edits/s)")
+
+
+if __name__ == "__main__":
+    main()
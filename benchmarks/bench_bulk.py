@@ -0,0 +1,59 @@
+"""Bulk -d / -e versus one call per word.
+
+Deletes and edits --words random words of a synthetic dictionary, once
+with a delete_word/edit_word call (and commit) per word, once with a
+single delete_words/edit_words statement; plus a --prefix selection.
+Every case runs on a fresh copy of the database.
+
+    python benchmarks/bench_bulk.py [--rows 100000] [--words 5000]
+"""
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import VocabularyDB, build_db
+
+
+def timed(path: Path, work: Path, fn) -> float:
+    shutil.copyfile(path, work)
+    with VocabularyDB(str(work)) as db:
+        started = time.perf_counter()
+        fn(db)
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path, work = Path(tmp) / "bench.db", Path(tmp) / "work.db"
+        build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            with db.get_connection() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                words = [row[0] for row in conn.execute(
+                    "SELECT english FROM dict ORDER BY random() LIMIT ?",
+                    (args.words,))]
+
+        cases = {
+            "delete, one call per word": lambda db: [
+                db.delete_word(word) for word in words],
+            "delete, bulk": lambda db: db.delete_words(words),
+            "edit, one call per word": lambda db: [
+                db.edit_word(word, "правка") for word in words],
+            "edit, bulk": lambda db: db.edit_words("правка", words=words),
+            "delete --prefix ab, bulk": lambda db: db.delete_words(prefix="ab"),
+        }
+        print(f"{args.words} words of {args.rows}")
+        for name, fn in cases.items():
+            elapsed = timed(path, work, fn)
+            print(f"{name:<28} {elapsed * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
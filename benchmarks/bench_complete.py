@@ -0,0 +1,84 @@
+"""Tab-completion lookups: the word index versus a database search.
+
+On a synthetic dictionary of --rows words, times the lookup of random 1-3
+letter prefixes with
+
+  index     completion.complete(): bisect of the mapped index file plus
+            the replay of its change log (--log changes are logged first)
+  -s        VocabularyDB.search_words(), the search of `eng -s`
+
+and the wall time of whole `eng --complete PREFIX` processes, which is
+what one Tab costs (next to a bare interpreter start). Building the
+index is timed too.
+
+    python benchmarks/bench_complete.py [--rows 1000000] [--log 1000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from common import SOURCE_DIR, VocabularyDB, build_db, measure, summarize
+
+import completion  # noqa: E402  (source/ is on sys.path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--log", type=int, default=1_000,
+                        help="changes in the log during the lookups")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prefixes = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz")
+                        for _ in range(rng.randint(1, 3)))
+                for _ in range(args.repeat)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            started = time.perf_counter()
+            db.build_word_index()
+            built = time.perf_counter() - started
+            for i in range(args.log):
+                db.add_word(f"zz{i:06d}", "слово")
+
+            timed = {
+                "index": iter(prefixes),
+                "-s": iter(prefixes),
+            }
+            results = {
+                "index": measure(lambda: completion.complete(
+                    next(timed["index"]), db_path=path), args.repeat),
+                "-s": measure(lambda: db.search_words(
+                    next(timed["-s"])), args.repeat),
+            }
+
+        env = dict(os.environ, ENG_DB_PATH=str(path),
+                   ENG_CONFIG_PATH=str(Path(tmp) / "config.json"))
+        main_py = str(SOURCE_DIR / "main.py")
+        results["python -c pass"] = measure(lambda: subprocess.run(
+            [sys.executable, "-c", "pass"], check=True), args.processes)
+        results["eng --complete"] = measure(lambda: subprocess.run(
+            [sys.executable, main_py, "--complete", rng.choice(prefixes)],
+            env=env, stdout=subprocess.DEVNULL, check=True), args.processes)
+
+    print(f"{args.rows} words, {args.log} logged changes; "
+          f"index built in {built:.2f}s")
+    print(f"{'lookup':<16} {'median ms':>10} {'p95 ms':>10}")
+    for name, timings in results.items():
+        stats = summarize(timings)
+        print(f"{name:<16} {stats['median_us'] / 1000:>10.2f} "
+              f"{stats['p95_us'] / 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Per-command latency with and without the resident daemon.
+
+Three ways to run the same commands against one synthetic database:
+
+  * local   - `python main.py ...` with daemon mode off (ENG_DAEMON=0)
+  * client  - `python main.py ...` forwarding to the daemon (ENG_DAEMON=1)
+  * socket  - the request sent straight to the daemon socket, i.e. the
+              cost once the client's interpreter startup is out of the way
+
+    python benchmarks/bench_daemon.py [--rows 200000] [--runs 20]
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+from common import SOURCE_DIR, build_db, measure, summarize
+
+MAIN = SOURCE_DIR / "main.py"
+COMMANDS = {
+    "search": ["-s", "ab"],
+    "fuzzy": ["--fuzzy", "recieve"],
+    "add": ["-n", "benchword{i}", "слово"],
+    "delete": ["-d", "benchword{i}"],
+}
+
+
+def cli(argv, env):
+    subprocess.run([sys.executable, str(MAIN)] + argv, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+
+
+def raw(argv, path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(argv).encode() + b"\n")
+        while sock.recv(1 << 16):
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_db(Path(tmp) / "bench.db", args.rows)
+        env = dict(os.environ, ENG_DB_PATH=str(Path(tmp) / "bench.db"),
+                   ENG_CONFIG_PATH=str(Path(tmp) / "config.json"),
+                   ENG_SOCKET=str(Path(tmp) / "eng.sock"))
+        local_env = dict(env, ENG_DAEMON="0")
+        daemon_env = dict(env, ENG_DAEMON="1")
+        cli(["-s", "ab"], daemon_env)  # starts the daemon
+
+        print(f"{args.rows} rows, median ms")
+        print(f"{'command':<8} {'local':>8} {'client':>8} {'socket':>8}")
+        try:
+            for name, template in COMMANDS.items():
+                counter = iter(range(10 ** 9))
+
+                def argv():
+                    i = next(counter)
+                    return [a.format(i=i % args.runs) for a in template]
+
+                row = []
+                for run in (lambda: cli(argv(), local_env),
+                            lambda: cli(argv(), daemon_env),
+                            lambda: raw(argv(), env["ENG_SOCKET"])):
+                    stats = summarize(measure(run, args.runs))
+                    row.append(stats["median_us"] / 1000)
+                print(f"{name:<8} {row[0]:>8.1f} {row[1]:>8.1f} {row[2]:>8.2f}")
+        finally:
+            subprocess.run([sys.executable, str(MAIN), "--daemon", "STOP"],
+                           env=env, stdout=subprocess.DEVNULL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""A small deck inside a huge shared database versus the same deck alone.
+
+The small deck (--small words) is built twice: as the only deck of its
+own database, and as one deck next to a --big word deck. Every deck
+operation should cost the same in both, since its queries read the
+deck's part of the (deck_id, ...) indexes only.
+
+    python benchmarks/bench_decks.py [--small 1000] [--big 1000000]
+"""
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import VocabularyDB, build_db, measure, summarize
+
+
+def run(db: VocabularyDB, repeat: int) -> dict:
+    with db.get_connection() as conn:
+        words = [row[0] for row in conn.execute(
+            "SELECT english FROM dict WHERE deck_id = ? ORDER BY random() "
+            "LIMIT ?", (db.deck_id, repeat))]
+    lookups = iter(words)
+    prefixes = iter([word[:2] for word in words])
+
+    def walk(result):
+        for _ in result.data:
+            pass
+
+    timed = {
+        "-l (walk the deck)": lambda: walk(db.iter_words()),
+        "-s prefix": lambda: walk(db.iter_words(prefix=next(prefixes))),
+        "-t due batch": lambda: db.get_due_cards(50, now=time.time()),
+        "get word": lambda: db.get_word(next(lookups)),
+        "stats (deck switch)": lambda: (db.use_deck("default"),
+                                        db.use_deck("small")),
+    }
+    return {name: summarize(measure(fn, repeat))["median_us"] / 1000
+            for name, fn in timed.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--small", type=int, default=1_000)
+    parser.add_argument("--big", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        alone, shared = Path(tmp) / "alone.db", Path(tmp) / "shared.db"
+        build_db(alone, args.small, seed=1, deck="small")
+        build_db(shared, args.big, seed=0)
+        build_db(shared, args.small, seed=1, deck="small")
+
+        results = []
+        for path in (alone, shared):
+            with VocabularyDB(str(path)) as db:
+                db.use_deck("small")
+                results.append(run(db, args.repeat))
+
+    print(f"deck of {args.small} words, median ms")
+    print(f"{'operation':<22} {'alone':>9} {f'+{args.big} deck':>14}")
+    for name in results[0]:
+        print(f"{name:<22} {results[0][name]:>9.3f} {results[1][name]:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Fuzzy lookup latency and recall on a synthetic dictionary.
+
+Every query is a random stored word with one or two random typos; recall
+is the share of queries whose original word is among the suggestions.
+
+    python benchmarks/bench_fuzzy.py [--rows 500000]
+"""
+import argparse
+import random
+import string
+import tempfile
+from pathlib import Path
+
+from common import VocabularyDB, build_db, measure, summarize
+
+
+def with_typos(word: str, typos: int, rng: random.Random) -> str:
+    for _ in range(typos):
+        i = rng.randrange(len(word))
+        kind = rng.choice(("substitute", "delete", "insert", "transpose"))
+        if kind == "substitute":
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+        elif kind == "delete" and len(word) > 3:
+            word = word[:i] + word[i + 1:]
+        elif kind == "insert":
+            word = word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+        elif i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def run(db: VocabularyDB, repeat: int) -> None:
+    rng = random.Random(0)
+    with db.get_connection() as conn:
+        words = [row[0] for row in conn.execute(
+            "SELECT english FROM dict ORDER BY random() LIMIT ?", (repeat,))]
+
+    for typos in (1, 2):
+        queries = [(word, with_typos(word, typos, rng)) for word in words]
+        found = 0
+        pending = iter(queries)
+
+        def lookup():
+            nonlocal found
+            original, query = next(pending)
+            result = db.fuzzy_search(query)
+            found += any(m["english"] == original for m in result.data)
+
+        stats = summarize(measure(lookup, repeat))
+        print(f"{typos} typo(s): median {stats['median_us'] / 1000:6.2f} ms  "
+              f"p95 {stats['p95_us'] / 1000:6.2f} ms  "
+              f"max {stats['max_us'] / 1000:6.2f} ms  "
+              f"recall {found / repeat:.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--db", type=Path, help="use an existing database")
+    args = parser.parse_args()
+
+    if args.db:
+        with VocabularyDB(str(args.db)) as db:
+            run(db, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            print(f"{db.get_num_of_entries()} rows")
+            run(db, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""--maintain after add/delete churn, and --backup under a steady writer.
+
+Deletes --churn of the words of a synthetic dictionary (and adds as many
+new ones), runs maintain() and reports the space it gave back; twice: the
+database is first made a file without incremental vacuum (as those created
+before it), so the first run converts it with a full VACUUM, the second
+one takes the incremental path. Then copies the database with backup()
+while another connection adds a word every --write-every seconds, like a
+training session saving its answers, and reports the longest write.
+
+    python benchmarks/bench_maintain.py [--rows 300000] [--churn 0.3]
+"""
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+from common import VocabularyDB, build_db, synthetic_words
+
+
+def churn(db: VocabularyDB, count: int, seed: int) -> None:
+    with db.get_connection() as conn:
+        words = [row[0] for row in conn.execute(
+            "SELECT english FROM dict ORDER BY random() LIMIT ?", (count,))]
+    db.delete_words(words)
+    db.import_words((f"{eng}{seed}", rus, ctx)
+                    for eng, rus, ctx in synthetic_words(count, seed=seed))
+
+
+def writer(path: Path, every: float, stop: threading.Event,
+           latencies: list) -> None:
+    with VocabularyDB(str(path)) as db:
+        for number in range(10 ** 9):
+            if stop.is_set():
+                break
+            started = time.perf_counter()
+            db.add_word(f"written{number}", "слово")
+            latencies.append(time.perf_counter() - started)
+            time.sleep(every)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--churn", type=float, default=0.3)
+    parser.add_argument("--write-every", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            with db.get_connection() as conn:
+                conn.execute("PRAGMA auto_vacuum = NONE")
+                conn.execute("VACUUM")
+            for run in (1, 2):
+                churn(db, int(args.rows * args.churn), seed=run)
+                result = db.maintain()
+                data = result.data
+                print(f"maintain #{run}: {result.message} "
+                      f"{data['size_before'] / 2 ** 20:.1f} MiB -> "
+                      f"{data['size_after'] / 2 ** 20:.1f} MiB")
+                for name, seconds in data["steps"].items():
+                    print(f"  {name:<32} {seconds:>7.2f}s")
+
+            stop, latencies = threading.Event(), []
+            thread = threading.Thread(
+                target=writer, args=(path, args.write_every, stop, latencies))
+            thread.start()
+            time.sleep(1)
+            idle = len(latencies)
+            started = time.perf_counter()
+            result = db.backup(str(Path(tmp) / "copy.db"))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            thread.join()
+
+    during = latencies[idle:] or [0.0]
+    print(f"backup: {result.message} {result.data / 2 ** 20:.1f} MiB "
+          f"in {elapsed:.2f}s")
+    print(f"  writes during the backup: {len(during)}, longest "
+          f"{max(during) * 1000:.1f} ms (before it: "
+          f"{max(latencies[:idle] or [0.0]) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
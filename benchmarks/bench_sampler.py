@@ -0,0 +1,75 @@
+"""Next-question latency of training_mode: Fenwick sampler vs. the old loop.
+
+The old code rebuilt the whole weight list and called random.choices for
+every question (O(n)); WeightedSampler updates one word and draws in
+O(log n). Both are driven through the same simulated session where most
+words are still unseen and some have errors.
+
+    python benchmarks/bench_sampler.py [--sizes 1000 100000 1000000]
+"""
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts source/ on sys.path)
+from sampler import WeightedSampler
+
+
+def legacy_draw(words, rng: random.Random, current_time: float):
+    weights = []
+    for word in words:
+        time_factor = current_time - word["last_seen_time"]
+        if word["last_seen_time"] == 0.0:
+            time_factor = 1000
+        error_factor = word["session_errors"] + 1
+        weights.append(time_factor * error_factor)
+    return rng.choices(range(len(words)), weights=weights, k=1)[0]
+
+
+def bench_legacy(size: int, questions: int) -> float:
+    rng = random.Random(0)
+    words = [{"last_seen_time": 0.0, "session_errors": 0} for _ in range(size)]
+    elapsed = 0.0
+    for _ in range(questions):
+        start = time.perf_counter()
+        idx = legacy_draw(words, rng, time.time())
+        elapsed += time.perf_counter() - start
+        words[idx]["last_seen_time"] = time.time()
+        words[idx]["session_errors"] += rng.random() < 0.3
+    return elapsed / questions
+
+
+def bench_sampler(size: int, questions: int) -> float:
+    rng = random.Random(0)
+    sampler = WeightedSampler(size, rng)
+    errors = [0] * size
+    elapsed = 0.0
+    for _ in range(questions):
+        start = time.perf_counter()
+        idx = sampler.draw()
+        elapsed += time.perf_counter() - start
+        errors[idx] += rng.random() < 0.3
+        start = time.perf_counter()
+        sampler.update(idx, errors[idx])
+        elapsed += time.perf_counter() - start
+    return elapsed / questions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'words':>9} {'old loop':>12} {'sampler':>12} {'speedup':>9}")
+    for size in args.sizes:
+        # The old loop is slow on big decks: fewer questions keep it bearable
+        legacy = bench_legacy(size, max(5, args.questions * 1000 // size))
+        fenwick = bench_sampler(size, args.questions)
+        print(f"{size:>9} {legacy * 1e6:>9.1f} us {fenwick * 1e6:>9.1f} us"
+              f" {legacy / fenwick:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Latency of the search modes on a synthetic dictionary.
+
+    python benchmarks/bench_search.py [--rows 1000000] [--db existing.db]
+"""
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from common import VocabularyDB, build_db, measure, summarize
+
+
+def report(name: str, timings) -> None:
+    stats = summarize(timings)
+    print(f"{name:<28} median {stats['median_us'] / 1000:8.2f} ms"
+          f"   p95 {stats['p95_us'] / 1000:8.2f} ms")
+
+
+def run(db: VocabularyDB, repeat: int) -> None:
+    with db.get_connection() as conn:
+        sample = [tuple(row) for row in conn.execute(
+            "SELECT english, otherlg FROM dict ORDER BY random() LIMIT ?",
+            (repeat,))]
+    rng = random.Random(0)
+
+    def full_text(make_query):
+        queries = iter([make_query(eng, rus) for eng, rus in sample])
+        return measure(lambda: db.full_text_search(next(queries)), repeat)
+
+    report("fts: english word", full_text(lambda eng, rus: eng))
+    report("fts: translation", full_text(lambda eng, rus: rus))
+    report("fts: prefix", full_text(lambda eng, rus: eng[:4] + "*"))
+    report("fts: word in context", full_text(
+        lambda eng, rus: f'"{rng.choice(["she", "we", "he"])} {eng}"'))
+    report("fts: boolean", full_text(
+        lambda eng, rus: f"{eng} OR {rus} NOT zzzz"))
+    report("fts: very common word", full_text(lambda eng, rus: "market"))
+
+    prefixes = iter([eng[:3] for eng, _ in sample])
+    report("-s prefix (first 50 rows)", measure(
+        lambda: list(zip(range(50), db.iter_words(prefix=next(prefixes)).data)),
+        repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--db", type=Path, help="use an existing database")
+    args = parser.parse_args()
+
+    if args.db:
+        with VocabularyDB(str(args.db)) as db:
+            run(db, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            print(f"{db.get_num_of_entries()} rows")
+            run(db, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Memory and time-to-first-question of the training session store.
+
+Compares, on a synthetic dictionary of --rows words (all new, so all due):
+
+  dicts     the old session: get_all_words() rows as dicts plus the
+            session counters, the whole deck before the first question
+  session   TrainingSession: ids, schedules and counters in typed arrays,
+            texts read only for the word being asked
+
+"first question" is the time until the first word can be shown (load,
+sampler, text of the word); "whole deck" holds every word in the session,
+the worst case of a very long training. Memory is the tracemalloc peak.
+
+    python benchmarks/bench_session.py [--rows 1000000] [--db existing.db]
+"""
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from common import VocabularyDB, build_db
+
+from sampler import WeightedSampler  # noqa: E402  (source/ is on sys.path)
+from session import TrainingSession  # noqa: E402
+
+BATCH = 50
+
+
+def dict_session(db: VocabularyDB, limit=None):
+    words = db.get_all_words().data
+    sampler = WeightedSampler(0)
+    for word in words:
+        word["session_errors"] = 0
+        word["session_correct"] = 0
+        sampler.append()
+    word = words[sampler.draw()]
+    return words, sampler, word["english"]
+
+
+def array_session(db: VocabularyDB, limit=None):
+    session = TrainingSession()
+    sampler = WeightedSampler(0)
+    last = None
+    while limit is None or len(session) < limit:
+        cards = db.get_due_cards(BATCH if limit else 10_000, after=last).data
+        if not cards:
+            break
+        last = (cards[-1][4], cards[-1][0])
+        for _ in session.extend(cards):
+            sampler.append()
+    english = db.get_card(session.ids[sampler.draw()]).data[0]
+    return session, sampler, english
+
+
+def run(fn, db: VocabularyDB, limit=None):
+    started = time.perf_counter()
+    fn(db, limit)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    kept = fn(db, limit)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del kept
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", type=Path, help="use an existing database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            path = Path(tmp) / "bench.db"
+            build_db(path, args.rows)
+        with VocabularyDB(str(path)) as db:
+            rows = db.get_num_of_entries()
+            print(f"{rows} words")
+            print(f"{'store':<10} {'load':<16} {'time':>10} {'peak memory':>13}")
+            cases = [
+                ("dicts", "whole deck", dict_session, None),
+                ("session", "first question", array_session, BATCH),
+                ("session", "whole deck", array_session, None),
+            ]
+            for name, load, fn, limit in cases:
+                elapsed, peak = run(fn, db, limit)
+                print(f"{name:<10} {load:<16} {elapsed * 1000:>8.1f}ms "
+                      f"{peak / 2 ** 20:>10.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Cold-start wall time and import cost of every CLI action.
+
+Each action runs as a fresh `python source/main.py ...` process against a
+throwaway database and config (ENG_DB_PATH / ENG_CONFIG_PATH). The script
+fails (exit code 1) when
+
+  * an action imports a module it must not need (e.g. `requests` for `-s`,
+    anything sqlite/colorama for `-h`), or
+  * with --baseline, a median wall time regressed by more than --tolerance.
+
+    python benchmarks/bench_startup.py --save startup.json
+    python benchmarks/bench_startup.py --baseline startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from common import SOURCE_DIR, build_db
+
+MAIN = SOURCE_DIR / "main.py"
+
+# action name -> (argv, modules that must stay unimported)
+ACTIONS: Dict[str, Tuple[List[str], Set[str]]] = {
+    "help": (["-h"], {"sqlite3", "colorama", "requests", "db_rule",
+                      "daemon"}),
+    "ai-state": (["--ai-state", "OFF"], {"sqlite3", "colorama", "requests"}),
+    "complete": (["--complete", "ab"],
+                 {"sqlite3", "colorama", "requests", "db_rule", "json"}),
+    "search": (["-s", "ab"], {"requests", "daemon"}),
+    "list": (["-l"], {"requests", "daemon"}),
+    "add": (["-n", "{word}", "слово"], {"requests"}),
+    "delete": (["-d", "{word}"], {"requests"}),
+}
+
+
+def run_once(argv: List[str], env: Dict[str, str],
+             importtime: bool = False) -> Tuple[float, str]:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    start = time.perf_counter()
+    proc = subprocess.run(cmd + [str(MAIN)] + argv, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          text=True)
+    return time.perf_counter() - start, proc.stderr
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """Total self import time (ms) and the set of imported modules."""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--save", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (default 0.25)")
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        build_db(Path(tmp) / "bench.db", args.rows)
+        env = dict(os.environ,
+                   ENG_DB_PATH=str(Path(tmp) / "bench.db"),
+                   ENG_CONFIG_PATH=str(Path(tmp) / "config.json"),
+                   ENG_DAEMON="0")
+
+        print(f"{'action':<10} {'median ms':>10} {'min ms':>8} {'imports ms':>11}")
+        for name, (template, forbidden) in ACTIONS.items():
+            def argv(i):
+                return [a.format(word=f"benchword{i}") for a in template]
+
+            # add/delete touch the same words in both loops on purpose
+            timings = [run_once(argv(i), env)[0] for i in range(args.runs)]
+            _, stderr = run_once(argv(args.runs), env, importtime=True)
+            import_ms, modules = parse_importtime(stderr)
+
+            median_ms = statistics.median(timings) * 1000
+            results[name] = {"median_ms": median_ms,
+                             "min_ms": min(timings) * 1000,
+                             "import_ms": import_ms}
+            print(f"{name:<10} {median_ms:>10.1f} {min(timings) * 1000:>8.1f}"
+                  f" {import_ms:>11.1f}")
+
+            leaked = forbidden & modules
+            if leaked:
+                failures.append(f"{name}: imports {', '.join(sorted(leaked))}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            limit = baseline[name]["median_ms"] * (1 + args.tolerance)
+            if result["median_ms"] > limit:
+                failures.append(f"{name}: {result['median_ms']:.1f} ms "
+                                f"> {limit:.1f} ms allowed")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Every entry point of the application, timed at several dictionary sizes.
+
+For each size a synthetic dictionary is built (realistic word lengths,
+Cyrillic translations, a share of contexts) and these are measured in
+process, on a copy so every run starts from the same data:
+
+  construct   VocabularyDB() on an existing database (migrations, stats)
+  add         VocabularyDB.add_word with a new word
+  get         VocabularyDB.get_word of an existing word
+  search      VocabularyDB.search_words by a two-letter prefix
+  get_all     VocabularyDB.get_all_words
+  edit        VocabularyDB.edit_word of an existing word
+  delete      VocabularyDB.delete_word of an existing word
+  list        `eng -l` rendering (auxiliary.list_all, output discarded)
+  training    one training question (auxiliary.training_mode driven by
+              scripted answers on stdin)
+
+Results can be saved as JSON and compared against a saved baseline; the
+script exits with 1 if a median got slower than --tolerance allows.
+
+    python benchmarks/bench_suite.py --save before.json
+    python benchmarks/bench_suite.py --baseline before.json
+    python benchmarks/bench_suite.py --sizes 1000 --cache-dir /tmp/eng-bench
+"""
+import io
+import os
+import sys
+import json
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+from common import VocabularyDB, build_db, measure, summarize, synthetic_words
+
+import auxiliary  # noqa: E402  (source/ is on sys.path via common)
+
+# Operations that walk the whole dictionary get fewer repetitions
+FULL_SCANS = {"get_all", "list"}
+
+
+@contextmanager
+def discard_stdout():
+    """Sends fd 1 to /dev/null, print() and render.py's writers alike."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+@contextmanager
+def scripted_stdin(lines: List[str]):
+    saved = sys.stdin
+    sys.stdin = io.StringIO("".join(line + "\n" for line in lines))
+    try:
+        yield
+    finally:
+        sys.stdin = saved
+
+
+def dictionary(size: int, cache_dir: Path) -> Path:
+    """A synthetic database of `size` words, built once per cache dir."""
+    path = cache_dir / f"dict-{size}.db"
+    if not path.exists():
+        print(f"building {size} words...", file=sys.stderr)
+        building = path.with_suffix(".tmp")
+        build_db(building, size)
+        # Fold the WAL into the file, so a plain copy is the whole database
+        conn = sqlite3.connect(building)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        building.rename(path)
+    return path
+
+
+def run_size(size: int, source: Path, work: Path, ops: int,
+             scan_repeat: int) -> Dict[str, Dict[str, float]]:
+    shutil.copyfile(source, work)
+    rng = random.Random(size)
+    results = {}
+
+    results["construct"] = summarize(
+        measure(lambda: VocabularyDB(str(work)).close(), min(ops, 50)))
+
+    with VocabularyDB(str(work)) as db:
+        with db.get_connection() as conn:
+            existing = [row[0] for row in conn.execute(
+                "SELECT english FROM dict ORDER BY random() LIMIT ?",
+                (ops * 3,))]
+        fresh = iter(list(synthetic_words(ops, seed=size + 1)))
+        lookups = iter(existing)
+        edits = iter(existing[ops:])
+        deletions = iter(existing[ops * 2:])
+        prefixes = [rng.choice("abcdefghiklmnoprst") + rng.choice("aeiou")
+                    for _ in range(ops)]
+        prefix = iter(prefixes)
+
+        timed = {
+            "add": (lambda: db.add_word(*next(fresh)), ops),
+            "get": (lambda: db.get_word(next(lookups)), ops),
+            "search": (lambda: db.search_words(next(prefix)), ops),
+            "get_all": (db.get_all_words, scan_repeat),
+            "edit": (lambda: db.edit_word(next(edits), "правка"), ops),
+            "delete": (lambda: db.delete_word(next(deletions)), ops),
+        }
+        for name, (fn, repeat) in timed.items():
+            results[name] = summarize(measure(fn, repeat))
+
+        # The CLI functions use the module's shared database; point it at
+        # the benchmark copy instead of ENG_DB_PATH
+        auxiliary._db = db
+        with discard_stdout():
+            results["list"] = summarize(
+                measure(auxiliary.list_all, scan_repeat))
+
+            # Wrong answers only: every question is drawn, checked,
+            # rescheduled and logged, and the session never runs dry
+            with scripted_stdin(["-"] * ops + ["exit"]):
+                total = measure(auxiliary.training_mode, 1)[0]
+        auxiliary._db = None
+        results["training"] = {"median_us": total / ops * 1e6,
+                               "p95_us": None, "max_us": None}
+
+    for name, result in results.items():
+        result["runs"] = scan_repeat if name in FULL_SCANS else (
+            1 if name == "training" else ops)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    failures = []
+    print(f"\n{'size':>8} {'operation':<10} {'baseline':>12} {'now':>12} "
+          f"{'change':>8}")
+    for size, ops in results["results"].items():
+        for name, result in ops.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = result["median_us"] / before["median_us"]
+            mark = ""
+            if ratio > 1 + tolerance:
+                mark = "  REGRESSION"
+                failures.append(f"{name} at {size} rows: "
+                                f"{result['median_us']:.1f} us vs "
+                                f"{before['median_us']:.1f} us")
+            print(f"{size:>8} {name:<10} {before['median_us']:>10.1f}us "
+                  f"{result['median_us']:>10.1f}us {ratio - 1:>+7.0%}{mark}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=200,
+                        help="calls per operation (default 200)")
+    parser.add_argument("--scan-repeat", type=int, default=3,
+                        help="calls of get_all and list (default 3)")
+    parser.add_argument("--cache-dir", type=Path,
+                        help="keep the generated dictionaries here")
+    parser.add_argument("--save", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (default 0.25)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {"python": platform.python_version(),
+                 "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(),
+                 "ops": args.ops},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = args.cache_dir or Path(tmp)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        print(f"{'size':>8} {'operation':<10} {'median':>12} {'p95':>12}")
+        for size in args.sizes:
+            source = dictionary(size, cache_dir)
+            ops = run_size(size, source, Path(tmp) / "work.db", args.ops,
+                           args.scan_repeat)
+            results["results"][str(size)] = ops
+            for name, result in ops.items():
+                p95 = (f"{result['p95_us']:>10.1f}us"
+                       if result["p95_us"] is not None else f"{'-':>12}")
+                print(f"{size:>8} {name:<10} {result['median_us']:>10.1f}us "
+                      f"{p95}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+    failures = []
+    if args.baseline:
+        failures = compare(results, json.loads(args.baseline.read_text()),
+                           args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Shared helpers for the benchmark scripts: synthetic data and timing."""
+import sys
+import time
+import random
+import string
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+SOURCE_DIR = Path(__file__).resolve().parent.parent / "source"
+if str(SOURCE_DIR) not in sys.path:
+    sys.path.insert(0, str(SOURCE_DIR))
+
+from db_rule import VocabularyDB  # noqa: E402
+
+CYRILLIC = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+SENTENCE_WORDS = ("the", "a", "she", "he", "we", "quickly", "always",
+                  "found", "made", "saw", "near", "under", "after", "market")
+
+
+def _word(rng: random.Random, alphabet: str, low: int, high: int) -> str:
+    # Roughly natural lengths: most words are 5-9 letters long
+    length = max(low, min(high, int(rng.gauss((low + high) / 2, 2.5))))
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def synthetic_words(
+        count: int, seed: int = 0,
+        context_ratio: float = 0.3) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """Yields unique (english, otherlg, context) rows."""
+    rng = random.Random(seed)
+    seen = set()
+    while len(seen) < count:
+        eng = _word(rng, string.ascii_lowercase, 3, 14)
+        if eng in seen:
+            continue
+        seen.add(eng)
+        rus = _word(rng, CYRILLIC, 3, 16)
+        ctx = None
+        if rng.random() < context_ratio:
+            words = rng.sample(SENTENCE_WORDS, 4)
+            words.insert(rng.randrange(len(words) + 1), eng)
+            ctx = " ".join(words).capitalize() + "."
+        yield eng, rus, ctx
+
+
+def build_db(path: Path, count: int, seed: int = 0,
+             context_ratio: float = 0.3, deck: Optional[str] = None) -> None:
+    """Creates (or adds to) a vocabulary database of `count` synthetic
+    words, in deck if given."""
+    with VocabularyDB(str(path), profile="bulk") as db:
+        deck_id = db.use_deck(deck, create=True).data
+        with db.get_connection() as conn:
+            rows = synthetic_words(count, seed, context_ratio)
+            conn.executemany(
+                "INSERT INTO dict (deck_id, english, otherlg, context, "
+                "english_cf, otherlg_cf) VALUES (?, ?, ?, ?, ?, ?)",
+                ((deck_id, eng, rus, ctx, eng.casefold(), rus.casefold())
+                 for eng, rus, ctx in rows))
+            conn.commit()
+
+
+def measure(fn: Callable[[], object], repeat: int) -> List[float]:
+    """Runs fn `repeat` times, returns the wall time of every call in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Median/p95/max of timings, in microseconds."""
+    ordered = sorted(timings)
+    return {
+        "median_us": statistics.median(ordered) * 1e6,
+        "p95_us": ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
@@ -1,4 +1,5 @@
-from auxiliary import *
+# Only the action that runs imports what it needs: `eng -h` must not pay
+# for colorama, sqlite3 or opening the database.
 
 USAGE = """\
 Usage: eng [-n EN RU [CONTEXT]] [-d WORD] 
@@ -6,33 +7,128 @@ Usage: eng [-n EN RU [CONTEXT]] [-d WORD]
 
 English Vocabulary Helper
 
+Any command can be prefixed with --profile [--pstats FILE] to print
+where its time goes. The word commands (-n, -d, -e, -s, -r, -f,
+--fuzzy, -l, -t, --import, --export) take --deck NAME to work on one deck of
+the dictionary (default: default); -n and --import create it.
+
 Options:
   -h,                          show help message
   -n EN RU [CONTEXT]           add a new word
   -d WORD                      delete a word
   -e WORD [-t RU] [-c CONTEXT] edit entry: RU and/or CTX
+  -d WORDS | -e WORDS [-t RU] [-c CONTEXT]
+                               delete or edit many words at once;
+                               WORDS: WORD [WORD...], --file FILE (one
+                               word per line, - for stdin), --prefix
+                               PREFIX or --glob PATTERN; --dry-run only
+                               lists them
   -s PREFIX                    words with a PREFIX beginning
+  -r PREFIX                    words whose translation begins with PREFIX
+  -f QUERY                     full-text search in words, translations
+                               and contexts: word, "a phrase", pre*,
+                               AND / OR / NOT
+  --fuzzy WORD                 words and translations similar to WORD
+                               (typo-tolerant)
   -l                           output the entire dictionary
   -t                           training mode
+  --decks                      list the decks and their word counts
+  --import FILE [--format FMT] [--on-conflict POLICY]
+                               import words from FILE (or - for stdin);
+                               FMT: csv, tsv or jsonl (default: guessed),
+                               POLICY: skip, overwrite or fail
+                               (default skip)
+  --export FILE [--format FMT] write the dictionary to FILE (or - for
+                               stdout), FMT: csv, tsv or jsonl
   --ai-state STATE             toggle AI context generation
                                ON or OFF (default OFF)
-  --ai-key API_KEY             set Google Gemini API key\
+  --ai-key API_KEY             set Google Gemini API key
+  --ai-cache STATE             cache of generated contexts: ON, OFF
+                               (default ON), STATS or PURGE
+  --ai-backfill [--limit N] [--workers N]
+                               generate AI contexts for the words
+                               that have none
+  --ai-worker                  generate the AI contexts still queued
+                               by -n (normally done in the background)
+  --maintain                   check the database, give back the space
+                               of deleted words and refresh the query
+                               planner statistics
+  --backup DEST                copy the database to DEST (safe while
+                               eng is in use)
+  --completion SHELL           print the tab-completion script for SHELL
+                               (bash or zsh), e.g. in ~/.bashrc:
+                               eval "$(eng --completion bash)"
+  --shell                      run commands one after another in an
+                               interactive prompt (with history)
+  --batch FILE [--commit-every N]
+                               run the commands of FILE (or - for stdin),
+                               one per line, in a single transaction
+                               (committed every N commands with N)
+  --daemon STATE               keep a background process with the open
+                               database for fast repeated calls: ON,
+                               OFF (default OFF), STATUS or STOP\
 """
 
-actions = {"-h", "-n", "-d", "-e", "-s", "-l", "-t", "--ai-state", "--ai-key"}
+actions = {"-h", "-n", "-d", "-e", "-s", "-r", "-f", "-l", "-t", "--fuzzy",
+           "--import", "--export", "--decks", "--completion",
+           "--maintain", "--backup",
+           "--ai-state", "--ai-key", "--ai-cache",
+           "--ai-backfill", "--ai-worker", "--daemon",
+           "--shell", "--batch"}
+
+# Actions that work on the words of one deck, and those that create it
+DECK_ACTIONS = {"-n", "-d", "-e", "-s", "-r", "-f", "-l", "-t", "--fuzzy",
+                "--import", "--export"}
+CREATES_DECK = {"-n", "--import"}
+
+
+def take_option(args, name):
+    """Removes `name VALUE` from args and returns VALUE.
 
-def save_config(config_data):
-    """Saving the configuration to a JSON file"""
+    Returns None when the option is absent and raises ValueError
+    when it has no value."""
+    if name not in args:
+        return None
+    idx = args.index(name)
+    if idx + 1 >= len(args):
+        raise ValueError(f"Expected a value after {name}")
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    return value
+
+
+def take_selection(args):
+    """Removes the words a bulk -d / -e works on from args.
+
+    Returns (selection, dry_run), where selection holds the words,
+    path, prefix and pattern keys of which exactly one is set, or None
+    after printing what is wrong."""
+    dry_run = "--dry-run" in args
+    if dry_run:
+        args.remove("--dry-run")
     try:
-        with open(CONF_PATH, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving the configuration: {e}")
-        return False
+        selection = {"path": take_option(args, "--file"),
+                     "prefix": take_option(args, "--prefix"),
+                     "pattern": take_option(args, "--glob")}
+    except ValueError as e:
+        print(f"{e}. See `eng -h`")
+        return None
+    selection["words"] = list(args) or None
+    if sum(value is not None for value in selection.values()) != 1:
+        print("Expected WORD..., --file FILE, --prefix PREFIX or "
+              "--glob PATTERN. See `eng -h`")
+        return None
+    return selection, dry_run
 
 
 def parse_args(args):
+    # --deck NAME may stand anywhere, `eng --deck work -l` included
+    args = list(args)
+    try:
+        deck = take_option(args, "--deck")
+    except ValueError as e:
+        print(f"{e}. See `eng -h`")
+        return
     if not args:
         print(USAGE)
         return
@@ -45,6 +141,16 @@ def parse_args(args):
     if action not in actions:
         print("Invalid option! See `eng -h`")
         return 
+
+    if action in DECK_ACTIONS:
+        # Also without --deck: a shell or the daemon may have left
+        # another deck selected
+        from auxiliary import select_deck
+        if not select_deck(deck, create=action in CREATES_DECK):
+            return
+    elif deck is not None and action not in ("--shell", "--batch"):
+        print(f"--deck cannot be used with {action}. See `eng -h`")
+        return
     
     if action == "-h":
         print(USAGE)
@@ -55,6 +161,7 @@ def parse_args(args):
             return
 
         state, *other = other
+        from settings import load_config, save_config
         config = load_config()
 
         if state == "ON":
@@ -73,6 +180,7 @@ def parse_args(args):
             return
 
         api_key, *other = other
+        from settings import load_config, save_config
         config = load_config()
 
         config["GOOGLE_GEMINI_API_KEY"] = api_key
@@ -80,6 +188,91 @@ def parse_args(args):
             print("Google Gemini API key saved to config.json")
         else:
             print("Failed to save API key to config.json")
+    elif action == "--ai-cache":
+        if len(other) != 1 or other[0] not in ("ON", "OFF", "STATS", "PURGE"):
+            print("Expected ON, OFF, STATS or PURGE after --ai-cache. "
+                  "See `eng -h`")
+            return
+        state, *_ = other
+        from auxiliary import ai_cache_command
+        ai_cache_command(state)
+    elif action == "--ai-backfill":
+        try:
+            limit = take_option(other, "--limit")
+            workers = take_option(other, "--workers")
+        except ValueError as e:
+            print(f"{e}. See `eng -h`")
+            return
+        if other:
+            print("Extra arguments! See `eng -h`")
+            return
+        if not all(value is None or value.isdigit() and int(value) > 0
+                   for value in (limit, workers)):
+            print("--limit and --workers must be positive numbers. See `eng -h`")
+            return
+        limit = int(limit) if limit is not None else None
+        workers = int(workers) if workers is not None else None
+        from auxiliary import ai_backfill
+        ai_backfill(limit, workers)
+    elif action == "--ai-worker":
+        # --quiet is passed by the worker that -n starts in the background
+        if other not in ([], ["--quiet"]):
+            print("Extra arguments! See `eng -h`")
+            return
+        from auxiliary import run_ai_worker
+        run_ai_worker(quiet=bool(other))
+    elif action == "--shell":
+        if other:
+            print("Extra arguments! See `eng -h`")
+            return
+        from shell import run_shell
+        run_shell(deck)
+    elif action == "--batch":
+        try:
+            commit_every = take_option(other, "--commit-every")
+        except ValueError as e:
+            print(f"{e}. See `eng -h`")
+            return
+        if len(other) != 1:
+            print("Expected argument FILE. See `eng -h`")
+            return
+        if commit_every is not None and not (commit_every.isdigit()
+                                             and int(commit_every) > 0):
+            print("--commit-every must be a positive number. See `eng -h`")
+            return
+        path, *_ = other
+        from shell import run_batch
+        run_batch(path, int(commit_every) if commit_every else None, deck)
+    elif action == "--daemon":
+        # SERVE is what a client starts in the background
+        if len(other) != 1 or other[0] not in ("ON", "OFF", "STATUS", "STOP",
+                                               "SERVE"):
+            print("Expected ON, OFF, STATUS or STOP after --daemon. "
+                  "See `eng -h`")
+            return
+        state, *_ = other
+        import daemon
+        if state == "SERVE":
+            from settings import get_config
+            from constants import DAEMON_IDLE_SECONDS
+            daemon.serve(get_config().get("DAEMON_IDLE_SECONDS",
+                                          DAEMON_IDLE_SECONDS))
+        elif state == "STATUS":
+            from settings import daemon_enabled
+            mode = "ON" if daemon_enabled() else "OFF"
+            running = "running" if daemon.is_running() else "not running"
+            print(f"Daemon mode: {mode}, daemon {running} "
+                  f"({daemon.socket_path()})")
+        elif state == "STOP":
+            print("Daemon stopped." if daemon.stop() else "No daemon running.")
+        else:
+            from settings import load_config, save_config
+            config = load_config()
+            config["DAEMON_ENABLED"] = state == "ON"
+            if save_config(config):
+                print(f"Daemon mode {'enabled' if state == 'ON' else 'disabled'}.")
+            if state == "OFF":
+                daemon.stop()
     elif action == "-n":
         if len(other) < 2:
             print("Expected arguments EN RU. See `eng -h`")
@@ -91,21 +284,35 @@ def parse_args(args):
             return
         
         ctx = " ".join(other) if other else None
+        from auxiliary import add_word
         add_word(en, ru, ctx)
     elif action == "-d":
-        if len(other) != 1:
-            print("Expected single argument WORD. See `eng -h`")
+        taken = take_selection(other)
+        if taken is None:
             return
-    
-        word, *_ = other
-        delete_word(word)
+        selection, dry_run = taken
+        words = selection["words"]
+        if words and len(words) == 1 and not dry_run:
+            from auxiliary import delete_word
+            delete_word(words[0])
+            return
+        from auxiliary import bulk_update
+        bulk_update(True, dry_run=dry_run, **selection)
     elif action == "-e":
         if not other:
             print("Expected argument WORD. See `eng -h`")
             return
 
-        en, *other = other
-        if not other:
+        # The words (or the --file/--prefix/--glob selection) come before
+        # -t and -c, the context takes the rest of the line
+        values_at = min([other.index(flag) for flag in ("-t", "-c")
+                         if flag in other] or [len(other)])
+        taken = take_selection(other[:values_at])
+        if taken is None:
+            return
+        selection, dry_run = taken
+        other = other[values_at:]
+        if not other and not dry_run:
             print("Nothing changed!")
             return
 
@@ -137,22 +344,104 @@ def parse_args(args):
                 print("Expected parameter CONTEXT!")
                 return
             ctx = " ".join(ctx_args)
-        edit_word(en, ru, ctx)
-    elif action == "-s":
+        words = selection["words"]
+        if words and len(words) == 1 and not dry_run:
+            from auxiliary import edit_word
+            edit_word(words[0], ru, ctx)
+            return
+        from auxiliary import bulk_update
+        bulk_update(False, new_rus=ru, new_context=ctx, dry_run=dry_run,
+                    **selection)
+    elif action in ("-s", "-r"):
         if len(other) != 1:
             print("Expected argument PREFIX. See `eng -h`")
             return
         prefix, *_ = other
-        show_by_prefix(prefix)
+        from auxiliary import show_by_prefix
+        show_by_prefix(prefix, reverse=action == "-r")
+    elif action == "-f":
+        if not other:
+            print("Expected argument QUERY. See `eng -h`")
+            return
+        from auxiliary import show_full_text
+        show_full_text(" ".join(other))
+    elif action == "--fuzzy":
+        if len(other) != 1:
+            print("Expected argument WORD. See `eng -h`")
+            return
+        word, *_ = other
+        from auxiliary import show_fuzzy
+        show_fuzzy(word)
     elif action == "-l":
         if len(other) != 0:
             print("Extra arguments! See `eng -h`")
             return
+        from auxiliary import list_all
         list_all()
+    elif action == "--import":
+        try:
+            fmt = take_option(other, "--format")
+            policy = take_option(other, "--on-conflict") or "skip"
+        except ValueError as e:
+            print(f"{e}. See `eng -h`")
+            return
+        if len(other) != 1:
+            print("Expected argument FILE. See `eng -h`")
+            return
+        if fmt is not None and fmt not in ("csv", "tsv", "jsonl"):
+            print("Invalid format! Use csv, tsv or jsonl. See `eng -h`")
+            return
+        if policy not in ("skip", "overwrite", "fail"):
+            print("Invalid conflict policy! Use skip, overwrite or fail. "
+                  "See `eng -h`")
+            return
+        path, *_ = other
+        from auxiliary import import_words
+        import_words(path, fmt, policy)
+    elif action == "--export":
+        try:
+            fmt = take_option(other, "--format")
+        except ValueError as e:
+            print(f"{e}. See `eng -h`")
+            return
+        if len(other) != 1:
+            print("Expected argument FILE. See `eng -h`")
+            return
+        if fmt is not None and fmt not in ("csv", "tsv", "jsonl"):
+            print("Invalid format! Use csv, tsv or jsonl. See `eng -h`")
+            return
+        path, *_ = other
+        from auxiliary import export_words
+        export_words(path, fmt)
     elif action == "-t":
         if len(other) != 0:
             print("Extra arguments! See `eng -h`")
             return
+        from auxiliary import training_mode
         training_mode()
+    elif action == "--maintain":
+        if other:
+            print("Extra arguments! See `eng -h`")
+            return
+        from auxiliary import maintain_database
+        maintain_database()
+    elif action == "--backup":
+        if len(other) != 1:
+            print("Expected argument DEST. See `eng -h`")
+            return
+        from auxiliary import backup_database
+        backup_database(other[0])
+    elif action == "--completion":
+        if other not in (["bash"], ["zsh"]):
+            print("Expected bash or zsh after --completion. See `eng -h`")
+            return
+        from auxiliary import completion_script
+        completion_script(other[0], actions - {"--ai-worker"})
+    elif action == "--decks":
+        if len(other) != 0:
+            print("Extra arguments! See `eng -h`")
+            return
+        from auxiliary import list_decks
+        list_decks()
     else:
         print(":(")
\ No newline at end of file
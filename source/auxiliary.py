@@ -1,149 +1,409 @@
 import time
-import json
-import random
-import requests
-from pathlib import Path
+import atexit
+import sqlite3
+import itertools
 from colorama import Fore, Style
 from db_rule import VocabularyDB
-from typing import Dict, Optional, Any
+from settings import get_config
+from typing import Iterable, List, Optional, Tuple
 
-API_URL = ("https://generativelanguage.googleapis.com"
-           "/v1beta/models/gemini-1.5-flash:generateContent")
-CONF_PATH = Path(__file__).parent.parent / 'config.json'
+from constants import AI_CACHE_TTL_DAYS, AI_CACHE_MAX_ENTRIES
+from constants import (AI_BACKFILL_WORKERS, AI_BACKFILL_RATE,
+                       AI_BACKFILL_RETRIES, AI_BACKFILL_BATCH)
+from constants import AI_QUEUE_RETRY_DELAY, AI_QUEUE_MAX_ATTEMPTS
 
-db = VocabularyDB()
+_db: Optional[VocabularyDB] = None
 
 
-def load_config():
-    config_path = CONF_PATH
-    default_config = {
-        "AI_ASSIST_ENABLED": False,
-        "GOOGLE_GEMINI_API_KEY": ""
-    }
-    
-    try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Creating a file with default settings
+def get_db() -> VocabularyDB:
+    """The database is opened on first use, not on import."""
+    global _db
+    if _db is None:
         try:
-            with open(config_path, 'w', encoding='utf-8') as file:
-                json.dump(default_config, file, indent=2, ensure_ascii=False)
-        except Exception:
-            pass  # We silently ignore file creation errors.
-        return default_config
+            _db = VocabularyDB(profile=get_config().get("DB_PROFILE"))
+        except sqlite3.Error as e:
+            raise SystemExit(f"{Fore.LIGHTRED_EX}{e}{Style.RESET_ALL}")
+        atexit.register(_db.close)
+    return _db
+
+
+def select_deck(name: Optional[str], create: bool = False) -> bool:
+    """Switches to deck name (None: the default one) for the next command."""
+    result = get_db().use_deck(name, create)
+    if not result.success:
+        print(result.message)
+        if name:
+            print("See `eng --decks` for the existing decks.")
+    return result.success
+
+
+def list_decks() -> None:
+    result = get_db().get_decks()
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}")
+        return
+    width = max(len(deck["name"]) for deck in result.data)
+    for deck in result.data:
+        print(f"{Fore.LIGHTGREEN_EX}{deck['name']:<{width}}{Style.RESET_ALL}"
+              f"  {deck['num_entries']} words")
+
+
+def completion_script(shell: str, actions) -> None:
+    """--completion: prints the script; the first call also builds the
+    completion index, which the write paths keep up to date afterwards."""
+    import sys
+    import completion
+    db = get_db()
+    if not completion.enabled(db.db_path):
+        result = db.build_word_index()
+        if not result.success:
+            print(result.message, file=sys.stderr)
+            return
+    print(completion.script(shell, actions), end="")
+
+
+def _mib(size: int) -> str:
+    return f"{size / 2 ** 20:.1f} MiB"
+
+
+def maintain_database() -> None:
+    result = get_db().maintain()
+    data = result.data or {}
+    for name, seconds in data.get("steps", {}).items():
+        print(f"{name:<32} {seconds:>7.2f}s")
+    if not result.success:
+        print(f"{Fore.LIGHTRED_EX}{result.message}{Style.RESET_ALL}")
+        for problem in data.get("problems", []):
+            print(f"  {problem}")
+        return
+    before, after = data["size_before"], data["size_after"]
+    print(f"{Fore.LIGHTGREEN_EX}Reclaimed {_mib(max(before - after, 0))}"
+          f"{Style.RESET_ALL} ({_mib(before)} -> {_mib(after)}) "
+          f"in {sum(data['steps'].values()):.2f}s")
+
+
+def backup_database(path: str) -> None:
+    def report(done: int, total: int) -> None:
+        print(f"\rCopied {done} of {total} pages", end="", flush=True)
 
+    started = time.perf_counter()
+    result = get_db().backup(path, progress=report)
+    print()
+    if not result.success:
+        print(f"{Fore.LIGHTRED_EX}{result.message}{Style.RESET_ALL}")
+        return
+    print(f"Backed up to {path}: {_mib(result.data)} "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+def ai_cache_command(state: str) -> None:
+    """--ai-cache: ON/OFF toggles the cache, STATS and PURGE inspect it."""
+    from settings import load_config, save_config
 
-config = load_config()
-AI_ASSIST_ENABLED = config.get("AI_ASSIST_ENABLED")
-GOOGLE_GEMINI_API_KEY = config.get("GOOGLE_GEMINI_API_KEY")
+    if state in ("ON", "OFF"):
+        config = load_config()
+        config["AI_CACHE_ENABLED"] = state == "ON"
+        if save_config(config):
+            print(f"AI context cache {'enabled' if state == 'ON' else 'disabled'}.")
+        return
+
+    db = get_db()
+    if state == "PURGE":
+        result = db.purge_context_cache()
+        if result.success:
+            print(f"Removed {result.data} cached contexts.")
+        else:
+            print(f"Error purging the cache: {result.message}")
+        return
 
+    result = db.get_context_cache_stats()
+    if not result.success:
+        print(f"Error reading the cache: {result.message}")
+        return
+    stats = result.data
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+    enabled = get_config().get("AI_CACHE_ENABLED", True)
+    print(f"AI context cache: {'ON' if enabled else 'OFF'}")
+    print(f"Entries: {stats['entries']}")
+    print(f"Hits: {stats['hits']}, misses: {stats['misses']} "
+          f"(hit rate {hit_rate:.1f}%)")
+
+
+def ai_backfill(limit: Optional[int] = None,
+                workers: Optional[int] = None) -> None:
+    """--ai-backfill: generates contexts for the words that have none."""
+    api_key = _api_key()
+    if not api_key:
+        return
 
-def get_ai_context(word: str, timeout: int = 10) -> Optional[str]:
-    if not GOOGLE_GEMINI_API_KEY:
+    db = get_db()
+    result = db.count_missing_context()
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}")
+        return
+    total = result.data
+    if limit is not None:
+        total = min(total, limit)
+    if not total:
+        print("Every word already has a context.")
+        return
+    batch_size = get_config().get("AI_BACKFILL_BATCH", AI_BACKFILL_BATCH)
+
+    def missing():
+        # Read in chunks as the workers need more words
+        after_id, left = 0, total
+        while left > 0:
+            result = db.get_missing_context(after_id, min(batch_size, left))
+            if not result.success or not result.data:
+                return
+            yield from result.data
+            after_id = result.data[-1][0]
+            left -= len(result.data)
+
+    started = time.perf_counter()
+    filled, failed = _fill_contexts(db, missing(), api_key, total=total,
+                                    workers=workers)
+    elapsed = time.perf_counter() - started
+    print(f"Filled {Fore.LIGHTGREEN_EX}{filled}{Style.RESET_ALL} contexts, "
+          f"{failed} failed, in {elapsed:.2f}s "
+          f"({filled / max(elapsed, 1e-9):.1f} words/s)")
+
+
+def _api_key(quiet: bool = False) -> Optional[str]:
+    api_key = get_config().get("GOOGLE_GEMINI_API_KEY")
+    if not api_key and not quiet:
         print(f"Error: Google Gemini API key is not set. Please use --ai-key to set it.")
-        return None
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": GOOGLE_GEMINI_API_KEY
-    }
-
-    prompt_text = f"""Create a concise English context sentence that demonstrates the meaning of the word '{word}'. 
-
-    Requirements:
-    - The sentence MUST contain the word '{word}' exactly as provided
-    - Keep the sentence short (45 characters maximum)
-    - The context should clearly illustrate the word's meaning through usage
-    - Use natural, everyday language
-    - Provide only the sentence, no additional explanation
-
-    Examples:
-    - Word: "apple" → "She bought a fresh apple from the local farmers market."
-    - Word: "innovation" → "The startup's innovation in AI technology impressed investors."
-    - Word: "navigate" → "He learned to navigate the complex subway system quickly."
-
-    Output format: Just the context sentence, nothing else."""
-
-    data = {
-        "contents": [
-            {
-                "parts": [
-                    {
-                        "text": prompt_text
-                    }
-                ]
-            }
-        ]
-    }
+    return api_key
+
+
+def _fill_contexts(db: VocabularyDB, words: Iterable[Tuple[int, str]],
+                   api_key: str, queued: bool = False, quiet: bool = False,
+                   total: Optional[int] = None,
+                   workers: Optional[int] = None) -> Tuple[int, int]:
+    """Generates and saves the contexts of (uniq_id, word) pairs; returns
+    (filled, failed).
+
+    Contexts found in ai_cache are reused, the other words go to Gemini
+    and their answers are cached. Everything is saved every
+    AI_BACKFILL_BATCH words and on Ctrl-C. With queued the words come
+    from ai_queue: saved ones leave it, failed ones are retried later."""
+    from gemini import MODEL, PROMPT_VERSION, generate_contexts
+
+    config = get_config()
+    use_cache = config.get("AI_CACHE_ENABLED", True)
+    batch_size = config.get("AI_BACKFILL_BATCH", AI_BACKFILL_BATCH)
+    done: list = []       # (uniq_id, context) to save
+    generated: list = []  # (word, context) to cache
+    failed: list = []     # uniq_id of the words left without a context
+    counts = {"done": 0, "filled": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def flush() -> None:
+        if done:
+            result = (db.finish_queued if queued else db.fill_contexts)(done)
+            if result.success:
+                counts["filled"] += len(done) if queued else result.data
+            elif not quiet:
+                print(f"\n{Fore.LIGHTRED_EX}{result.message}{Style.RESET_ALL}")
+            done.clear()
+        if use_cache:
+            db.put_cached_contexts(
+                generated, MODEL, PROMPT_VERSION,
+                max_entries=config.get("AI_CACHE_MAX_ENTRIES", AI_CACHE_MAX_ENTRIES))
+        generated.clear()
+        if failed and queued:
+            db.retry_queued(
+                failed,
+                config.get("AI_QUEUE_RETRY_DELAY", AI_QUEUE_RETRY_DELAY),
+                config.get("AI_QUEUE_MAX_ATTEMPTS", AI_QUEUE_MAX_ATTEMPTS))
+        failed.clear()
+
+    def progress() -> None:
+        counts["done"] += 1
+        if len(done) + len(failed) >= batch_size:
+            flush()
+        if not quiet:
+            of_total = f" of {total}" if total else ""
+            elapsed = time.perf_counter() - started
+            print(f"\rGenerated {counts['done']}{of_total} "
+                  f"({counts['done'] / max(elapsed, 1e-9):.1f} words/s)",
+                  end="", flush=True)
+
+    def uncached():
+        # Cache hits are saved right away, the rest go to Gemini
+        for uniq_id, word in words:
+            if use_cache:
+                cached = db.get_cached_context(
+                    word, MODEL, PROMPT_VERSION,
+                    ttl_days=config.get("AI_CACHE_TTL_DAYS", AI_CACHE_TTL_DAYS))
+                if cached.data:
+                    done.append((uniq_id, cached.data))
+                    progress()
+                    continue
+            yield uniq_id, word
+
+    results = generate_contexts(
+        uncached(), api_key,
+        workers=workers or config.get("AI_BACKFILL_WORKERS", AI_BACKFILL_WORKERS),
+        rate=config.get("AI_BACKFILL_RATE", AI_BACKFILL_RATE),
+        retries=config.get("AI_BACKFILL_RETRIES", AI_BACKFILL_RETRIES))
+    try:
+        for uniq_id, word, context in results:
+            if context:
+                done.append((uniq_id, context))
+                if use_cache:
+                    generated.append((word, context))
+            else:
+                failed.append(uniq_id)
+                counts["failed"] += 1
+            progress()
+    except KeyboardInterrupt:
+        if not quiet:
+            print("\nInterrupted, saving the contexts generated so far.")
+        if queued:
+            raise  # stops the worker; the other words stay queued
+    finally:
+        flush()
+        if not quiet and counts["done"]:
+            print()
+    return counts["filled"], counts["failed"]
 
+
+def spawn_ai_worker() -> None:
+    """Starts `eng --ai-worker` detached, so `eng -n` returns at once."""
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).with_name("main.py")),
+             "--ai-worker", "--quiet"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError as e:
+        print(f"Could not start the AI worker: {e}. "
+              "Run `eng --ai-worker` to generate the context.")
+
+
+def run_ai_worker(quiet: bool = False) -> None:
+    """--ai-worker: generates the contexts of the queued words.
+
+    Only one worker runs at a time (a lock file next to the database).
+    The detached worker takes the words that are due; a worker started
+    by hand also retries the ones still backing off."""
+    import fcntl
+    from pathlib import Path
+
+    db = get_db()
+    lock_path = Path(db.db_path).with_suffix(".ai-worker.lock")
+    totals = [0, 0]
     try:
-        response = requests.post(API_URL, headers=headers, json=data, timeout=timeout)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        response_json = response.json()
-
-        if "candidates" in response_json and len(response_json["candidates"]) > 0:
-            candidate = response_json["candidates"][0]
-            if "content" in candidate and "parts" in \
-                candidate["content"] and len(candidate["content"]["parts"]) > 0:
-                return candidate["content"]["parts"][0]["text"].strip()
-        print(f"{Fore.LIGHTRED_EX}Error: Unexpected response "
-              "format from Gemini API.{Style.RESET_ALL}")
-        return None
-
-    except requests.exceptions.Timeout:
-        print(f"Error: Google Gemini API request timed out after {timeout} seconds. "
-              "Please check your internet connection or try again later.")
-        print(f"If you are using a VPN, try disabling it or switching locations.")
-        return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error connecting to Google Gemini API: {e}")
-        print(f"Please check your API key and internet connection. If you are "
-              "using a VPN, try disabling it or switching locations.")
-        return None
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON response from Gemini API. "
-              f"Response: {response.text}")
-        return None
-    except Exception as e:
-        print(f"{Fore.LIGHTRED_EX}An unexpected error occurred while generating "
-              f"AI context for \'{word}\': {e}{Style.RESET_ALL}")
-        return None
-
-
-def print_word(word_data: Dict[str, Any], format: bool = True) -> None:
-    eng = word_data.get("english")
-    rus = word_data.get("otherlg")
-    ctx = word_data.get("context")
-
-    if not eng or not rus:
+        while True:
+            with open(lock_path, "w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    if not quiet:
+                        print("Another AI worker is already running.")
+                    return
+                filled, failed = _drain_ai_queue(db, quiet, due_only=quiet)
+                totals[0] += filled
+                totals[1] += failed
+            # A word queued while the lock was held would otherwise wait
+            # for the next `eng -n`: its own worker gave up on the lock
+            if not filled + failed or not db.count_queued(now=time.time()).data:
+                break
+    except KeyboardInterrupt:
+        pass
+
+    if not quiet:
+        left = db.count_queued()
+        queued = f"{left.data} still queued" if left.success else left.message
+        print(f"Filled {Fore.LIGHTGREEN_EX}{totals[0]}{Style.RESET_ALL} "
+              f"contexts, {totals[1]} failed, {queued}.")
+
+
+def _drain_ai_queue(db: VocabularyDB, quiet: bool, due_only: bool):
+    """Generates contexts for the queued words; returns (filled, failed)."""
+    api_key = _api_key(quiet)
+    if not api_key:
+        return 0, 0
+    batch_size = get_config().get("AI_BACKFILL_BATCH", AI_BACKFILL_BATCH)
+    now = time.time() if due_only else None
+
+    def queued():
+        after_id = 0
+        while True:
+            result = db.get_queued(after_id, batch_size, now)
+            if not result.success or not result.data:
+                return
+            yield from result.data
+            after_id = result.data[-1][0]
+
+    return _fill_contexts(db, queued(), api_key, queued=True, quiet=quiet)
+
+
+def word_template(maxEngWidth: int, maxRusWidth: int) -> str:
+    """str.format template for one word, built once per listing."""
+    return (
+        f"{Fore.LIGHTCYAN_EX}{{0:<{maxEngWidth}}}{Style.RESET_ALL} - "
+        + f"{Fore.LIGHTYELLOW_EX}{{1:<{maxRusWidth}}}{Style.RESET_ALL}"
+    )
+
+
+def context_suffix(ctx: Optional[str]) -> str:
+    return f" {Fore.LIGHTMAGENTA_EX}[{ctx}]{Style.RESET_ALL}" if ctx else ""
+
+
+def suggest_similar(word: str, prompt: str = "Did you mean: {}?") -> None:
+    """Prints dictionary words within a few typos of word, if there are any."""
+    result = get_db().fuzzy_search(word, limit=5)
+    if not result.success:
         return
+    similar = [m["english"] for m in result.data if m["english"] != word]
+    if similar:
+        print(prompt.format(", ".join(
+            f"{Fore.LIGHTCYAN_EX}{eng}{Style.RESET_ALL}" for eng in similar)))
 
-    max_widths = db.get_max_widths()
-    maxEngWidth = max_widths["english"]
-    maxRusWidth = max_widths["russian"]
 
-    print(
-        f"{Fore.LIGHTCYAN_EX}{eng:<{maxEngWidth}}{Style.RESET_ALL} - "
-        + f"{Fore.LIGHTYELLOW_EX}{rus:<{maxRusWidth}}{Style.RESET_ALL}"
-        + (f" {Fore.LIGHTMAGENTA_EX}[{ctx}]{Style.RESET_ALL}" if ctx else "")
-    )
+def show_fuzzy(word: str) -> None:
+    """Outputs words and translations within a few typos of word."""
+    result = get_db().fuzzy_search(word, limit=20, translations=True)
 
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}")
+        return
+    if not result.data:
+        print(f"No words similar to \'{word}\'")
+        return
+
+    maxEngWidth = max(len(m["english"]) for m in result.data)
+    maxRusWidth = max(len(m["otherlg"]) for m in result.data)
+    template = (f"{Fore.LIGHTRED_EX}{{2}}{Style.RESET_ALL} "
+                + word_template(maxEngWidth, maxRusWidth))
+    for idx, match in enumerate(result.data, start=1):
+        print(template.format(match["english"], match["otherlg"], idx)
+              + context_suffix(match["context"]))
 
-def add_word(eng: str, rus: str, context: Optional[str] = None) -> None:
-    if AI_ASSIST_ENABLED and context is None:
-        print(f"Generating AI context for {eng}...")
-        ai_generated_context = get_ai_context(eng)
-        if ai_generated_context:
-            context = ai_generated_context
-            print(f"Context: {Fore.LIGHTMAGENTA_EX}[{context}]{Style.RESET_ALL}")
-        else:
-            print(f"Failed to generate AI context for {eng}. Adding without context.")
 
-    result = db.add_word(eng, rus, context)
+def add_word(eng: str, rus: str, context: Optional[str] = None) -> None:
+    # The AI context is generated by a background worker, not waited for
+    enrich = bool(get_config().get("AI_ASSIST_ENABLED")) and context is None
+    db = get_db()
+    result = db.add_word(eng, rus, context, enqueue_context=enrich)
     
     if result.success:
         print(f"Added: {eng}")
+        # In a batch the word is not committed yet: run_batch starts one
+        # worker at the end, and skips the suggestions to stay fast
+        if enrich:
+            if not db.in_transaction:
+                spawn_ai_worker()
+            print(f"AI context for {eng} will be generated in the background.")
+        if not db.in_transaction:
+            suggest_similar(eng, "Similar words already in the dictionary: {}")
     else:
         print("Doctor's recommendation: Get checked for dementia.")
         show_by_prefix(eng)
@@ -151,36 +411,149 @@ def add_word(eng: str, rus: str, context: Optional[str] = None) -> None:
 
 
 def delete_word(eng: str) -> None:
-    result = db.delete_word(english=eng)
+    result = get_db().delete_word(english=eng)
     if result.success:
         print(f"Deleted: {eng}")
     else:
         print(f"Error deleting word: {result.message}")
+        suggest_similar(eng)
 
 
 def edit_word(eng: str, new_rus: Optional[str] = None, 
               new_context: Optional[str] = None) -> None:
-    result = db.edit_word(english=eng, new_otherlg=new_rus, new_context=new_context)
+    result = get_db().edit_word(english=eng, new_otherlg=new_rus, new_context=new_context)
     if result.success:
         print(f"Updated: {eng}")
     else:
         print(f"Error updating word: {result.message}")
+        suggest_similar(eng)
+
+
+def _listed_words(path: str):
+    # One word per line; blank lines and # comments are skipped
+    from transfer import open_input
+
+    with open_input(path) as file:
+        for line in file:
+            word = line.strip()
+            if word and not word.startswith("#"):
+                yield word
+
 
+def bulk_update(delete: bool, words: Optional[List[str]] = None,
+                path: Optional[str] = None, prefix: Optional[str] = None,
+                pattern: Optional[str] = None, new_rus: Optional[str] = None,
+                new_context: Optional[str] = None,
+                dry_run: bool = False) -> None:
+    """-d / -e over many words: the listed ones, those of a file, or those
+    matching a prefix or a glob pattern; dry_run only shows them."""
+    from constants import BULK_PREVIEW
 
-def show_by_prefix(letter: str) -> None:
-    """Outputs all words starting with the specified letter."""
-    result = db.search_words(prefix=letter)
+    db = get_db()
+    selection = {"words": _listed_words(path) if path else words,
+                 "prefix": prefix, "pattern": pattern}
+    try:
+        if dry_run:
+            result = db.select_words(**selection)
+        elif delete:
+            result = db.delete_words(**selection)
+        else:
+            result = db.edit_words(new_rus, new_context, **selection)
+    except OSError as e:
+        print(f"Error reading \'{path}\': {e}. Nothing was changed.")
+        return
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}")
+        return
+
+    verb = "deleted" if delete else "updated"
+    missing = result.data["missing"]
+    if dry_run:
+        matched = result.data["matched"]
+        print(f"Would be {verb}: {len(matched)} words")
+        for word in matched[:BULK_PREVIEW]:
+            print(f"  {Fore.LIGHTCYAN_EX}{word}{Style.RESET_ALL}")
+        if len(matched) > BULK_PREVIEW:
+            print(f"  ... and {len(matched) - BULK_PREVIEW} more")
+    else:
+        color = Fore.LIGHTRED_EX if delete else Fore.LIGHTGREEN_EX
+        print(f"{color}{result.data['count']} words {verb}{Style.RESET_ALL}")
+    if missing:
+        shown = ", ".join(missing[:BULK_PREVIEW])
+        more = f" and {len(missing) - BULK_PREVIEW} more" \
+            if len(missing) > BULK_PREVIEW else ""
+        print(f"Not found ({len(missing)}): {shown}{more}")
+
+
+def show_by_prefix(letter: str, reverse: bool = False) -> None:
+    """Outputs all words (with reverse: translations) starting with the
+    specified letter."""
+    from render import write_lines
+
+    db = get_db()
+    result = db.iter_words(prefix=letter, reverse=reverse)
 
     if not result.success:
         print(f"Message from db {Style.RESET_ALL}: {result.message}")
         return
-    if not result.data:
+    rows = result.data
+    first = next(rows, None)
+    if first is None:
+        if reverse:
+            print(f"No translations found for letter \'{letter}\'")
+            return
         print(f"No words found for letter \'{letter}\'")
+        suggest_similar(letter)
+        return
+
+    max_widths = db.get_max_widths()
+    template = (f"{Fore.LIGHTRED_EX}{{2}}{Style.RESET_ALL} "
+                + word_template(max_widths["english"], max_widths["russian"]))
+
+    def lines():
+        idx = 1
+        for eng, rus, ctx in itertools.chain([first], rows):
+            if not eng or not rus:
+                continue
+            line = template.format(eng, rus, idx)
+            yield line + context_suffix(ctx) if ctx else line
+            idx += 1
+
+    write_lines(lines())
+
+
+def _highlight(marked: str, raw: str, color: str, width: int = 0) -> str:
+    """Colors a full-text search field, matches in bright green."""
+    body = (marked.replace("\x02", Style.BRIGHT + Fore.LIGHTGREEN_EX)
+                  .replace("\x03", Style.RESET_ALL + color))
+    # Pad by the visible length, the color codes take no space on screen
+    return f"{color}{body}{Style.RESET_ALL}" + " " * (width - len(raw))
+
+
+def show_full_text(query: str) -> None:
+    """Outputs the best full-text matches of query, context snippets included."""
+    result = get_db().full_text_search(query, marks=("\x02", "\x03"))
+
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}")
+        return
+    if not result.data:
+        print(f"Nothing found for \'{query}\'")
         return
 
-    for idx, word_data in enumerate(result.data, start=1):
-        print(f"{Fore.LIGHTRED_EX}{idx}{Style.RESET_ALL}", end=" ")
-        print_word(word_data)
+    maxEngWidth = max(len(row["english"]) for row in result.data)
+    maxRusWidth = max(len(row["otherlg"]) for row in result.data)
+    for idx, row in enumerate(result.data, start=1):
+        line = (f"{Fore.LIGHTRED_EX}{idx}{Style.RESET_ALL} "
+                + _highlight(row["english_hl"], row["english"],
+                             Fore.LIGHTCYAN_EX, maxEngWidth)
+                + " - "
+                + _highlight(row["otherlg_hl"], row["otherlg"],
+                             Fore.LIGHTYELLOW_EX, maxRusWidth))
+        if row["context"]:
+            line += " " + _highlight(f"[{row['context_hl']}]", "",
+                                     Fore.LIGHTMAGENTA_EX)
+        print(line)
 
 
 def get_rest(full_string, start_string):
@@ -190,137 +563,261 @@ def get_rest(full_string, start_string):
 
 
 def training_mode() -> None:
-    result = db.get_all_words()
+    from sampler import WeightedSampler
+    from scheduler import review, EXACT, PREFIX, WRONG
+    from review_log import ReviewWriter
+    from session import TrainingSession
+    from constants import (TRAINING_BATCH_SIZE, REVIEW_FLUSH_EVERY,
+                           REVIEW_FLUSH_SECONDS)
+
+    db = get_db()
+    batch_size = int(get_config().get("TRAINING_BATCH_SIZE", TRAINING_BATCH_SIZE))
+
+    # Only the words that are due are loaded, a batch at a time, and only
+    # their ids and schedules: the texts are read when a word is asked
+    result = db.get_due_cards(batch_size, now=time.time())
+    if result.success and not result.data:
+        result = db.get_due_cards(batch_size)
+        if result.data:
+            print("No words are due for review, practicing ahead.")
 
     if not result.success or not result.data:
         print("The dictionary is empty!")
         return
 
-    dictionary_list = result.data
-
-    for word in dictionary_list:
-        word["last_seen_time"] = 0.0
-        word["session_errors"] = 0
-        word["session_correct"] = 0
+    session = TrainingSession()
+    # Unseen words and words not seen for long (and often missed) come first
+    sampler = WeightedSampler(0)
+    last_card = None  # (due, uniq_id) the next batch starts after
+
+    def add_to_session(cards) -> int:
+        nonlocal last_card
+        if cards:
+            last_card = (cards[-1][4], cards[-1][0])
+        slots = session.extend(cards)
+        for _ in slots:
+            sampler.append()
+        return len(slots)
+
+    def refill() -> int:
+        # Pages on from the last card; words already in the session
+        # (a missed word is due again in 10 minutes) are skipped
+        while True:
+            more = db.get_due_cards(batch_size, now=time.time(),
+                                    after=last_card)
+            if not more.success or not more.data:
+                return 0
+            added = add_to_session(more.data)
+            if added:
+                return added
+
+    # Words of the session that still wait for their first correct answer;
+    # when none are left, the next batch of due words joins the session
+    pending = add_to_session(result.data)
+
+    reviews = ReviewWriter(
+        db,
+        flush_every=int(get_config().get("REVIEW_FLUSH_EVERY", REVIEW_FLUSH_EVERY)),
+        flush_seconds=float(get_config().get("REVIEW_FLUSH_SECONDS",
+                                             REVIEW_FLUSH_SECONDS)))
 
     print("Enter \'exit\' or \'quit\' to exit")
-    while True:
-        weights = []
-        current_time = time.time()
-
-        for word in dictionary_list:
-            time_factor = current_time - word["last_seen_time"]
-            if word["last_seen_time"] == 0.0:
-                time_factor = 1000
-
-            error_factor = word["session_errors"] + 1
-            total_weight = time_factor * error_factor
-            weights.append(total_weight)
-
-        word_data = random.choices(dictionary_list, weights=weights, k=1)[0]
-
-        eng = word_data.get("english")
-        rus = word_data.get("otherlg")
-        ctx = word_data.get("context")
-
-        print(f"Translate it: {Fore.LIGHTCYAN_EX}{eng}{Style.RESET_ALL}")
-        if ctx:
-            print(f"Context: {Fore.LIGHTMAGENTA_EX}{ctx}{Style.RESET_ALL}")
-        print("> ", end="")
-
-        answer = input().strip()
-        if answer.lower() in ["exit", "quit"]:
-            total_answers = 0
-            total_correct = 0
-            total_incorrect = 0
-
-            for word in dictionary_list:
-                total_correct += word["session_correct"]
-                total_incorrect += word["session_errors"]
-
-            total_answers = total_correct + total_incorrect
-
-            print("\n" + "=" * 25)
-            print(f"{Fore.LIGHTYELLOW_EX}Training Session Summary{Style.RESET_ALL}")
-            print("=" * 25)
-
-            if total_answers > 0:
-                hardest_words = sorted(
-                    [w for w in dictionary_list if w["session_errors"] > 0],
-                    key=lambda x: x["session_errors"],
-                    reverse=True,
-                )
-
-                accuracy = (total_correct / total_answers) * 100
-
-                print(f"Total answers: {total_answers}")
+    # Leaving the block (exit, Ctrl-C, an error) saves the queued answers
+    with reviews:
+        while True:
+            slot = sampler.draw()
+            card = db.get_card(session.ids[slot])
+            if not card.success:
+                print(card.message)
+                break
+            eng, rus, ctx = card.data
+
+            print(f"Translate it: {Fore.LIGHTCYAN_EX}{eng}{Style.RESET_ALL}")
+            if ctx:
+                print(f"Context: {Fore.LIGHTMAGENTA_EX}{ctx}{Style.RESET_ALL}")
+            print("> ", end="")
+
+            asked_at = time.perf_counter()
+            try:
+                answer = input().strip()
+            except (KeyboardInterrupt, EOFError):
+                print()
+                break
+            latency = time.perf_counter() - asked_at
+            if answer.lower() in ["exit", "quit"]:
+                break
+
+            seen_at = time.time()
+
+            is_correct = False
+            if (
+                answer.strip()
+                and rus.lower().startswith(answer.lower())
+                and answer.lower() != rus.lower()
+            ):
                 print(
-                    f"  - {Fore.LIGHTGREEN_EX}Correct: {total_correct}{Style.RESET_ALL}"
+                    f"You mean: {answer}{Fore.LIGHTYELLOW_EX}{get_rest(rus, answer)}{Style.RESET_ALL}"
                 )
+                print(f"{Fore.LIGHTGREEN_EX}✓ Correctly!{Style.RESET_ALL}")
+                is_correct = True
+            elif answer.lower() == rus.lower():
+                print(f"{Fore.LIGHTGREEN_EX}✓ Correctly!{Style.RESET_ALL}")
+                is_correct = True
+            else:
+                print(f"{Fore.LIGHTRED_EX}✗ Incorrectly{Style.RESET_ALL}.", end=" ")
+                print(f"Right answer: {Fore.LIGHTYELLOW_EX}{rus}{Style.RESET_ALL}")
+                session.errors[slot] += 1
+
+            if is_correct:
+                session.correct[slot] += 1
+            sampler.update(slot, session.errors[slot], seen_at)
+
+            # A miss always resets the schedule; a hit counts as a review only
+            # when the word is due, repeats within the session are practice
+            grade = WRONG if not is_correct else (
+                EXACT if answer.lower() == rus.lower() else PREFIX)
+            schedule = None
+            if not is_correct or session.due[slot] <= seen_at:
+                schedule = review(session.schedule(slot), grade, seen_at)
+                session.set_schedule(slot, schedule)
+            reviews.record(session.ids[slot], is_correct, grade, latency,
+                           seen_at, schedule)
+
+            if is_correct and session.correct[slot] == 1:
+                pending -= 1
+                if pending <= 0:
+                    pending = refill()
+
+    print_training_summary(session)
+
+
+def print_training_summary(session) -> None:
+    total_correct, total_incorrect = session.totals()
+    total_answers = total_correct + total_incorrect
+
+    print("\n" + "=" * 25)
+    print(f"{Fore.LIGHTYELLOW_EX}Training Session Summary{Style.RESET_ALL}")
+    print("=" * 25)
+
+    if total_answers > 0:
+        hardest_words = session.hardest(5)
+
+        accuracy = (total_correct / total_answers) * 100
+
+        print(f"Total answers: {total_answers}")
+        print(
+            f"  - {Fore.LIGHTGREEN_EX}Correct: {total_correct}{Style.RESET_ALL}"
+        )
+        print(
+            f"  - {Fore.LIGHTRED_EX}Incorrect: {total_incorrect}{Style.RESET_ALL}"
+        )
+        print(f"Accuracy: {accuracy:.2f}%")
+
+        if hardest_words:
+            print("\nWords to practice:")
+            for word_id, errors in hardest_words:
+                card = get_db().get_card(word_id)
+                english = card.data[0] if card.success else f"#{word_id}"
                 print(
-                    f"  - {Fore.LIGHTRED_EX}Incorrect: {total_incorrect}{Style.RESET_ALL}"
+                    f"  - {english} ({Fore.LIGHTRED_EX}{errors} errors{Style.RESET_ALL})"
                 )
-                print(f"Accuracy: {accuracy:.2f}%")
-
-                if hardest_words:
-                    print("\nWords to practice:")
-                    for word in hardest_words[:5]:
-                        print(
-                            f"  - {word['english']} ({Fore.LIGHTRED_EX}{word['session_errors']} errors{Style.RESET_ALL})"
-                        )
-            else:
-                print("You didn't answer any questions.")
-
-            print("=" * 25)
-            print("\nTraining session is over!")
-            break
-
-        word_data["last_seen_time"] = time.time()
-
-        is_correct = False
-        if (
-            answer.strip()
-            and rus.lower().startswith(answer.lower())
-            and answer.lower() != rus.lower()
-        ):
-            print(
-                f"You mean: {answer}{Fore.LIGHTYELLOW_EX}{get_rest(rus, answer)}{Style.RESET_ALL}"
-            )
-            print(f"{Fore.LIGHTGREEN_EX}✓ Correctly!{Style.RESET_ALL}")
-            is_correct = True
-        elif answer.lower() == rus.lower():
-            print(f"{Fore.LIGHTGREEN_EX}✓ Correctly!{Style.RESET_ALL}")
-            is_correct = True
-        else:
-            print(f"{Fore.LIGHTRED_EX}✗ Incorrectly{Style.RESET_ALL}.", end=" ")
-            print(f"Right answer: {Fore.LIGHTYELLOW_EX}{rus}{Style.RESET_ALL}")
-            word_data["session_errors"] += 1
+    else:
+        print("You didn't answer any questions.")
 
-        if is_correct:
-            word_data["session_correct"] += 1
+    print("=" * 25)
+    print("\nTraining session is over!")
 
 def list_all() -> None:
-    result = db.get_all_words()
+    from render import write_lines
+
+    db = get_db()
+    result = db.iter_words()
     num_of_entries = db.get_num_of_entries()
 
-    if not result.success or not result.data:
+    if not result.success or not num_of_entries:
         print("The dictionary is empty!")
         return
-    
-    words = result.data  # The data is already sorted by ENGLISH word
-
-    counter = 0
-    last_letter = None
-    for word_data in words:
-        eng = word_data.get('english')
-        if not eng:
-            continue
-        current_letter = eng[0].lower()
-        if last_letter is None:
-            last_letter = current_letter
-        if last_letter != current_letter:
-            print()
-            last_letter = current_letter
-        counter += 1
-        print(f"{Fore.LIGHTRED_EX}{counter:<{len(str(num_of_entries)) + 1}}{Style.RESET_ALL}", end="")
-        print_word(word_data)
+
+    # The rows come sorted by ENGLISH word straight from the index
+    max_widths = db.get_max_widths()
+    idxWidth = len(str(num_of_entries)) + 1
+    template = (f"{Fore.LIGHTRED_EX}{{2:<{idxWidth}}}{Style.RESET_ALL}"
+                + word_template(max_widths["english"], max_widths["russian"]))
+
+    def lines():
+        counter = 0
+        last_letter = None
+        for eng, rus, ctx in result.data:
+            if not eng or not rus:
+                continue
+            current_letter = eng[0].lower()
+            if last_letter is None:
+                last_letter = current_letter
+            if last_letter != current_letter:
+                yield ""
+                last_letter = current_letter
+            counter += 1
+            line = template.format(eng, rus, counter)
+            yield line + context_suffix(ctx) if ctx else line
+
+    write_lines(lines())
+
+
+def import_words(path: str, fmt: Optional[str] = None,
+                 on_conflict: str = "skip") -> None:
+    from transfer import open_input, detect_format, read_rows
+
+    def report(read: int, written: int, elapsed: float) -> None:
+        rate = read / elapsed if elapsed else 0
+        print(f"\rRead {read} rows, written {written} ({rate:,.0f} rows/s)",
+              end="", flush=True)
+
+    try:
+        with open_input(path) as file:
+            first = file.readline()
+            fmt = fmt or detect_format(path, first)
+            rows = read_rows(itertools.chain([first], file), fmt)
+            result = get_db().import_words(rows, on_conflict, progress=report)
+    except (OSError, ValueError) as e:
+        print()
+        print(f"Error reading \'{path}\': {e}. Nothing was imported.")
+        return
+    print()
+
+    stats = result.data or {}
+    if not result.success:
+        print(f"{Fore.LIGHTRED_EX}{result.message}{Style.RESET_ALL}")
+        return
+    print(f"Imported from {path} ({fmt}): "
+          f"{Fore.LIGHTGREEN_EX}{stats['written']} written{Style.RESET_ALL}, "
+          f"{stats['skipped']} skipped, {stats['invalid']} invalid "
+          f"in {stats['seconds']:.2f}s "
+          f"({stats['read'] / max(stats['seconds'], 1e-9):,.0f} rows/s)")
+
+
+def export_words(path: str, fmt: Optional[str] = None) -> None:
+    import sys
+    from transfer import detect_format, export_to
+
+    fmt = fmt or ("csv" if path == "-" else detect_format(path))
+    # Keep stdout clean for the data itself when exporting to "-"
+    report = sys.stderr if path == "-" else sys.stdout
+
+    result = get_db().iter_words()
+    if not result.success:
+        print(f"Message from db {Style.RESET_ALL}: {result.message}", file=report)
+        return
+
+    started = time.perf_counter()
+    try:
+        count = export_to(path, result.data, fmt)
+    except BrokenPipeError:
+        from render import silence_stdout
+        silence_stdout()
+        return
+    except OSError as e:
+        print(f"Error writing \'{path}\': {e}", file=report)
+        return
+    elapsed = time.perf_counter() - started
+    print(f"Exported {count} words to {path} ({fmt}) in {elapsed:.2f}s "
+          f"({count / max(elapsed, 1e-9):,.0f} rows/s)", file=report)
@@ -0,0 +1,236 @@
+import os
+import sys
+import mmap
+import fcntl
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from constants import COMPLETE_LIMIT, DEFAULT_DECK
+
+# Word index for shell tab-completion, kept next to the database in
+# `<db>.words/`, one pair of files per deck (named by the hex of the deck
+# name, so the completer needs no database lookup):
+#
+#   <deck>        "ENGWORDS", uint32 count, uint32 record offsets, then
+#                 the records "key\tenglish\n" ("english\n" when the key
+#                 is the word itself), sorted by key; key is the casefolded
+#                 word, compared as UTF-8 bytes, which sorts like str
+#   <deck>.log    "+english\n" / "-english\n" changes made since the
+#                 index was built, replayed over it by every lookup
+#
+# VocabularyDB logs its changes after they are committed and rebuilds the
+# index from the database when the log grows long (COMPLETE_LOG_MAX);
+# both under a flock of the .log. The lookup side only maps and reads
+# files: `eng --complete` must not import sqlite3 or open the database.
+# Completion is off until `eng --completion SHELL` builds the directory.
+
+MAGIC = b"ENGWORDS"
+HEADER = struct.Struct("<8sI")
+
+
+def index_dir(db_path) -> Path:
+    return Path(f"{db_path}.words")
+
+
+def enabled(db_path) -> bool:
+    return os.path.isdir(index_dir(db_path))
+
+
+def _paths(db_path, deck: str):
+    base = index_dir(db_path) / (deck.encode("utf-8").hex() or "-")
+    return base, base.with_name(base.name + ".log")
+
+
+def _storable(word: str) -> bool:
+    return bool(word) and "\n" not in word and "\t" not in word
+
+
+def build(db_path, deck: str, words: Iterable[str]) -> None:
+    """Writes the index of deck from all of its words and empties its log.
+
+    The caller holds the log lock (see locked()) while reading the words,
+    so that no change committed meanwhile is lost."""
+    records = []
+    for english in words:
+        if not _storable(english):
+            continue
+        key = english.casefold()
+        records.append((key, english))
+    records.sort()
+
+    offsets, body, size = [], [], 0
+    for key, english in records:
+        line = (english if key == english else f"{key}\t{english}")
+        data = (line + "\n").encode("utf-8")
+        offsets.append(size)
+        body.append(data)
+        size += len(data)
+
+    path, log = _paths(db_path, deck)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(offsets)))
+        file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        file.writelines(body)
+    # Readers that have the old file mapped keep reading it
+    os.replace(tmp, path)
+    open(log, "wb").close()
+
+
+class locked:
+    """flock of a deck's log, for appending to it or rebuilding the index."""
+
+    def __init__(self, db_path, deck: str):
+        self.path = _paths(db_path, deck)[1]
+
+    def __enter__(self):
+        self.file = open(self.path, "ab")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self.file
+
+    def __exit__(self, *exc):
+        self.file.close()  # releases the lock
+
+
+def log_changes(db_path, deck: str, changes: Iterable[str]) -> int:
+    """Appends "+word" / "-word" changes; returns the log length in lines."""
+    data = "".join(f"{change}\n" for change in changes
+                   if _storable(change[1:])).encode("utf-8")
+    with locked(db_path, deck) as file:
+        file.write(data)
+        file.flush()
+        return _count_lines(file.name)
+
+
+def _count_lines(path) -> int:
+    with open(path, "rb") as file:
+        return file.read().count(b"\n")
+
+
+def _read_log(path) -> Dict[str, bool]:
+    # The last change of each word wins: True added, False removed
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return {}
+    changes = {}
+    # A line still being written has no newline yet and is skipped
+    for line in data.split(b"\n")[:-1]:
+        if line[:1] in (b"+", b"-"):
+            changes[line[1:].decode("utf-8", "replace")] = line[:1] == b"+"
+    return changes
+
+
+def _matches(path, prefix: bytes) -> Iterator[str]:
+    # Words of the index whose key starts with prefix, in key order
+    try:
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return  # no index yet, or an empty file
+    with data:
+        magic, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            return
+        start = HEADER.size + 4 * count
+
+        def record(i):
+            offset = start + struct.unpack_from("<I", data, HEADER.size + 4 * i)[0]
+            line = data[offset:data.find(b"\n", offset)]
+            key, _, english = line.partition(b"\t")
+            return key, english or key
+
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if record(middle)[0] < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        for i in range(low, count):
+            key, english = record(i)
+            if not key.startswith(prefix):
+                break
+            yield english.decode("utf-8")
+
+
+def complete(prefix: str, deck: Optional[str] = None, db_path=None,
+             limit: int = COMPLETE_LIMIT) -> List[str]:
+    """Words of deck starting with prefix (case-insensitive), at most limit."""
+    if db_path is None:
+        from settings import DB_PATH
+        db_path = DB_PATH
+    path, log = _paths(db_path, deck or DEFAULT_DECK)
+    key = prefix.casefold()
+    changes = {word: added for word, added in _read_log(log).items()
+               if word.casefold().startswith(key)}
+    words = {word for word, added in changes.items() if added}
+    for english in _matches(path, key.encode("utf-8")):
+        if len(words) >= limit + len(changes):
+            break
+        if changes.get(english, True):
+            words.add(english)
+    return sorted(words, key=lambda word: (word.casefold(), word))[:limit]
+
+
+def complete_main(args: List[str]) -> None:
+    """`eng --complete [--deck NAME] [PREFIX]`: one word per line."""
+    deck = None
+    if args[:1] == ["--deck"] and len(args) > 1:
+        deck, args = args[1], args[2:]
+    words = complete(args[0] if args else "", deck)
+    if words:
+        sys.stdout.write("\n".join(words) + "\n")
+
+
+SCRIPTS = {
+    "bash": r"""# eng tab-completion: eval "$(eng --completion bash)" in ~/.bashrc
+_eng_complete() {
+    local cur="${COMP_WORDS[COMP_CWORD]}" prev="${COMP_WORDS[COMP_CWORD-1]}"
+    local action="" deck=() word i
+    COMPREPLY=()
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        word="${COMP_WORDS[i]}"
+        if [[ $word == --deck ]]; then
+            deck=(--deck "${COMP_WORDS[i+1]}")
+            ((i++))
+        elif [[ -z $action ]]; then
+            action="$word"
+        elif [[ $action == -e && ( $word == -t || $word == -c ) ]]; then
+            return  # a translation or a context follows
+        fi
+    done
+    case "$prev" in
+        --file|--import|--export|--batch|--backup)
+            COMPREPLY=($(compgen -f -- "$cur")); return ;;
+        --deck|--prefix|--glob|-t|-c) return ;;
+    esac
+    if [[ -z $action ]]; then
+        COMPREPLY=($(compgen -W "--deck %(actions)s" -- "$cur"))
+        return
+    fi
+    case "$action" in
+        -d|-e) [[ $cur == -* ]] && {
+                    COMPREPLY=($(compgen -W "--file --prefix --glob --dry-run -t -c" -- "$cur"))
+                    return; } ;;
+        -s) [[ $prev == -s ]] || return ;;
+        *) return ;;
+    esac
+    local IFS=$'\n'
+    for word in $(eng --complete "${deck[@]}" "$cur" 2>/dev/null); do
+        COMPREPLY+=("$(printf '%%q' "$word")")
+    done
+}
+complete -F _eng_complete eng
+""",
+}
+# zsh runs the bash function through its bash completion emulation
+SCRIPTS["zsh"] = ("autoload -U +X bashcompinit && bashcompinit\n"
+                  + SCRIPTS["bash"].replace("bash)\" in ~/.bashrc",
+                                            "zsh)\" in ~/.zshrc"))
+
+
+def script(shell: str, actions: Iterable[str]) -> str:
+    return SCRIPTS[shell] % {"actions": " ".join(sorted(actions))}
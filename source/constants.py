@@ -1,3 +1,88 @@
 DB_NAME = 'eng_vocab.db'
 
+# Deck used when a command has no --deck NAME
+DEFAULT_DECK = 'default'
 
+# How many due words a training session loads at a time
+# (TRAINING_BATCH_SIZE in config.json overrides it)
+TRAINING_BATCH_SIZE = 50
+
+# Training answers are saved in batches: every N answers or N seconds
+REVIEW_FLUSH_EVERY = 20
+REVIEW_FLUSH_SECONDS = 30.0
+
+# SQLite pragmas applied once when VocabularyDB opens its connection.
+# The profile is selected with the DB_PROFILE key in config.json.
+DB_PROFILES = {
+    # WAL + NORMAL: readers never block the writer, no fsync per commit
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,       # ms
+        "mmap_size": 268435456,     # 256 MiB
+        "cache_size": -16384,       # negative value = KiB (16 MiB)
+        "temp_store": "MEMORY",
+    },
+    # Fsync on every commit, for machines that lose power a lot
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "mmap_size": 0,
+        "cache_size": -2048,
+        "temp_store": "DEFAULT",
+    },
+    # Scripted bulk runs: bigger cache, durability traded for speed
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 30000,
+        "mmap_size": 1073741824,    # 1 GiB
+        "cache_size": -131072,      # 128 MiB
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_DB_PROFILE = "default"
+
+# Cache of Gemini contexts (AI_CACHE_* keys in config.json override these)
+AI_CACHE_TTL_DAYS = 90
+AI_CACHE_MAX_ENTRIES = 10000
+
+# --ai-backfill: parallel requests, requests started per second, retries of
+# a rate limited or failed request, and words written per transaction
+# (AI_BACKFILL_* keys in config.json override these)
+AI_BACKFILL_WORKERS = 4
+AI_BACKFILL_RATE = 5.0
+AI_BACKFILL_RETRIES = 5
+AI_BACKFILL_BATCH = 100
+
+# Background AI worker (`eng -n` with AI on): a word whose context could not
+# be generated is retried after 1, 2, 4... minutes, at most N times
+AI_QUEUE_RETRY_DELAY = 60.0
+AI_QUEUE_MAX_ATTEMPTS = 8
+
+# A daemon (`eng --daemon ON`) exits after this many idle seconds
+# (DAEMON_IDLE_SECONDS in config.json overrides it)
+DAEMON_IDLE_SECONDS = 600
+
+# Actions run by the daemon. Training and the shell read the terminal,
+# import, export and batch take paths relative to the caller: those
+# always run locally.
+FORWARDED = {"-n", "-d", "-e", "-s", "-r", "-f", "--fuzzy", "-l"}
+
+# `eng --profile` / ENG_TRACE=1: statements slower than this are reported
+# with their query plan (ENG_TRACE_SLOW_MS overrides it)
+TRACE_SLOW_QUERY_MS = 50
+
+# Bulk -d / -e with --dry-run list at most this many of the matched words
+BULK_PREVIEW = 20
+
+# Tab-completion (`eng --completion bash|zsh`): at most this many words are
+# offered, and a deck's index is rebuilt from the database once this many
+# changes have been logged next to it
+COMPLETE_LIMIT = 200
+COMPLETE_LOG_MAX = 2000
+
+# `eng --backup`: database pages copied per step of the online backup;
+# other processes can use the database between steps
+BACKUP_STEP_PAGES = 1024
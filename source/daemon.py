@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import socket
+from typing import List, Optional
+
+from constants import FORWARDED
+from settings import daemon_enabled
+
+# Optional resident server. With daemon mode on (`eng --daemon ON` or
+# ENG_DAEMON=1) main.py forwards the quick actions over a Unix socket to a
+# long-running `eng` process that keeps the database open, so a call costs
+# a socket round trip instead of imports, migrations and stats loading.
+# The server is started on first use and exits after an idle period.
+
+# How long a client waits for a freshly spawned daemon before running
+# the command itself
+SPAWN_WAIT = 3.0
+
+# The output of a command ends with "\0<exit status>\n"; the client
+# holds back this many bytes until it has seen the end
+STATUS_TAIL = 8
+
+
+def socket_path() -> str:
+    """One socket per installation, database and config."""
+    import hashlib
+
+    explicit = os.environ.get("ENG_SOCKET")
+    if explicit:
+        return explicit
+    key = "\0".join([os.path.dirname(os.path.abspath(__file__)),
+                     os.environ.get("ENG_DB_PATH", ""),
+                     os.environ.get("ENG_CONFIG_PATH", "")])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return os.path.join(_runtime_dir(), f"eng-{os.getuid()}-{digest}.sock")
+
+
+def _runtime_dir() -> str:
+    # Names in the shared temp directory are predictable: another user
+    # could plant a symlink there, so the socket and lock go into a
+    # directory only this user can enter
+    import stat
+    import tempfile
+
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        return base
+    path = os.path.join(tempfile.gettempdir(), f"eng-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & 0o077):
+        raise OSError(f"{path} is not a private directory of this user")
+    return path
+
+
+def _connect(wait: float = 0.0) -> Optional[socket.socket]:
+    deadline = time.monotonic() + wait
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path())
+            return sock
+        except OSError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.01)
+
+
+def spawn() -> None:
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "main.py"),
+         "--daemon", "SERVE"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def forward(args: List[str]) -> Optional[int]:
+    """Runs args in the daemon, starting it if needed; returns the exit
+    status of the command.
+
+    Returns None when the command has to run in this process: the
+    action is not forwarded, daemon mode is off or no daemon came up."""
+    if not args or args[0] not in FORWARDED or not daemon_enabled():
+        return None
+    if "--file" in args:
+        return None  # the path and stdin are this process's
+    sock = _connect()
+    if sock is None:
+        try:
+            spawn()
+        except OSError:
+            return None
+        sock = _connect(wait=SPAWN_WAIT)
+        if sock is None:
+            return None
+
+    status = 1  # unless the daemon reports how the command ended
+    with sock:
+        sock.sendall(json.dumps(args).encode() + b"\n")
+        out = sys.stdout.buffer
+        tail = b""
+        try:
+            while True:
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    break
+                data = tail + chunk
+                out.write(data[:-STATUS_TAIL])
+                tail = data[-STATUS_TAIL:]
+            body, end, code = tail.rpartition(b"\0")
+            if end and code[:-1].isdigit() and code.endswith(b"\n"):
+                tail, status = body, int(code)
+            out.write(tail)
+            out.flush()
+        except BrokenPipeError:
+            from render import silence_stdout
+            silence_stdout()
+    return status
+
+
+def stop() -> bool:
+    """Asks a running daemon to exit; False if none was running."""
+    sock = _connect()
+    if sock is None:
+        return False
+    with sock:
+        sock.sendall(b"null\n")
+        sock.recv(1)  # closed once the daemon is done
+    return True
+
+
+def is_running() -> bool:
+    sock = _connect()
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def serve(idle_seconds: float) -> None:
+    """Serves requests one at a time until stopped or idle for idle_seconds."""
+    import fcntl
+    import settings
+    from argumparse import parse_args
+    from auxiliary import get_db
+
+    path = socket_path()
+    lock = os.fdopen(os.open(path + ".lock",
+                             os.O_WRONLY | os.O_CREAT | os.O_NOFOLLOW, 0o600),
+                     "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return  # another daemon already serves this database
+    if os.path.exists(path):
+        os.unlink(path)  # left behind by a daemon that was killed
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)  # only this user may connect
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(64)
+    server.settimeout(idle_seconds)
+    db = get_db()  # open the database before the first request
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            with conn:
+                conn.settimeout(None)
+                with conn.makefile("rb") as reader:
+                    line = reader.readline()
+                if not line:
+                    continue  # is_running() probing, not a request
+                try:
+                    request = json.loads(line)
+                except (ValueError, UnicodeDecodeError):
+                    _reply(conn, "Error: malformed request")
+                    continue
+                if request is None:
+                    break
+                if not isinstance(request, list) or not request \
+                        or request[0] not in FORWARDED:
+                    _reply(conn, "Error: not a forwarded command")
+                    continue
+                # Pick up changes made by other eng processes meanwhile
+                settings.reset_config()
+                db.refresh()
+                status = _run(conn, request, parse_args)
+                _reply(conn, f"\0{status}")
+    finally:
+        os.unlink(path)
+        server.close()
+        lock.close()
+
+
+def _reply(conn: socket.socket, message: str) -> None:
+    try:
+        conn.sendall(message.encode() + b"\n")
+    except OSError:
+        pass  # the client went away
+
+
+def _run(conn: socket.socket, args: List[str], parse_args) -> int:
+    # Point fd 1 and 2 at the client, so print() and the buffered
+    # writers in render.py reach it unchanged. Returns the exit status
+    # the command would have had in the client's process.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    os.dup2(conn.fileno(), 1)
+    os.dup2(conn.fileno(), 2)
+    status = 0
+    try:
+        parse_args(args)
+    except BrokenPipeError:
+        status = 1  # the client went away
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except Exception as e:
+        # A failed command must not take the daemon down
+        print(f"Error: {e}")
+        status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BrokenPipeError:
+            pass
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        os.close(saved[0])
+        os.close(saved[1])
+    return status
@@ -1,11 +1,40 @@
+import os
+import time
 import sqlite3
-from pathlib import Path
-from constants import DB_NAME
-from typing import Optional, Any, Dict
+from itertools import islice
+from constants import (DB_PROFILES, DEFAULT_DB_PROFILE, DEFAULT_DECK,
+                       COMPLETE_LOG_MAX, BACKUP_STEP_PAGES)
+from settings import DB_PATH
+from migrations import migrate, casefold
+import completion
+from fuzzy import trigrams, max_typos, edit_distance
+from scheduler import Schedule
+from typing import Optional, Any, Callable, Collection, Dict, Iterable, Sequence, Union
 from contextlib import contextmanager
 
-SCRIPT_DIR = Path(__file__).parent
-DB_NAME = SCRIPT_DIR.parent / "database" / DB_NAME
+CONFLICT_POLICIES = ("skip", "overwrite", "fail")
+
+# Fuzzy lookup: how many candidates are ranked by edit distance, and how
+# many trigram postings the candidate query may touch (rarest grams first)
+FUZZY_CANDIDATES = 200
+FUZZY_POSTING_BUDGET = 20000
+FUZZY_MIN_GRAMS = 3
+DB_NAME = DB_PATH
+
+
+def prefix_range(column: str, prefix: str) -> tuple:
+    """WHERE condition and parameters of the words whose column (a *_cf
+    column) starts with prefix, as a range an index can seek to."""
+    low = casefold(prefix)
+    stem = low.rstrip("\U0010ffff")
+    if not stem:
+        return f"{column} >= ?", [low]
+    # The smallest string above every string starting with stem
+    following = ord(stem[-1]) + 1
+    if 0xD800 <= following < 0xE000:
+        following = 0xE000  # surrogates cannot be encoded
+    return (f"{column} >= ? AND {column} < ?",
+            [low, stem[:-1] + chr(following)])
 
 
 class OperationResult:
@@ -25,109 +54,454 @@ class OperationResult:
 
 
 class VocabularyDB:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None,
+                 profile: Union[str, Dict[str, Any], None] = None):
         if db_path is None:
             db_path = DB_NAME
         self.db_path = db_path
-        self.init_database()
+        self.pragmas = self._resolve_profile(profile)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._deferred = False
+        # Changes of the completion index waiting for the commit, as
+        # {deck: ["+english", "-english", ...]}; None means rebuild
+        self._word_changes: Dict[str, Optional[list]] = {}
+        # AI cache lookups not written yet: hit/miss counts and the last
+        # use of every hit, saved by the next put_cached_contexts()
+        self._cache_hits = self._cache_misses = 0
+        self._cache_used: Dict[tuple, float] = {}
+        result = self.init_database()
+        if not result.success:
+            # Later queries would fail on the missing columns and tables
+            raise sqlite3.DatabaseError(result.message)
+
+        # Word methods work on one deck at a time, see use_deck()
+        self.deck = DEFAULT_DECK
+        self.deck_id = 1
+
+        # Сaching the maximum length of words and the number of entries
+        # of the current deck
+        self._max_widths = {"english": 10, "russian": 10}
+        self._num_of_entries = 0
+        self._data_version = None
+        self._load_stats()
 
-        # Сaching the maximum length of words
-        self._max_widths = self._calculate_max_widths()
-        self._num_of_entries = self._calculate_num_of_entries()
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _resolve_profile(
+            profile: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+        # A profile is either a name from DB_PROFILES or a dict of
+        # pragma overrides on top of the default profile
+        pragmas = dict(DB_PROFILES[DEFAULT_DB_PROFILE])
+        if isinstance(profile, dict):
+            pragmas.update(profile)
+        elif profile is not None:
+            pragmas.update(DB_PROFILES.get(profile, {}))
+        return pragmas
+
+    def _connect(self) -> sqlite3.Connection:
+        # One long-lived connection per process, pragmas applied once
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            # Only takes effect in a new file (before WAL is switched on
+            # and the tables exist): deleted pages can then be given back
+            # with PRAGMA incremental_vacuum, see maintain()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            self._conn = conn
+        return self._conn
 
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._connect()
+        if self._deferred:
+            # Inside transaction(): a failed call undoes only its own work
+            conn.execute("SAVEPOINT call")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK TO call")
+                conn.execute("RELEASE call")
+                raise
+            conn.execute("RELEASE call")
+            return
         try:
             yield conn
-        finally:
-            conn.close()
+        except BaseException:
+            # Do not leave a half-done transaction on the shared connection
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def _commit(self, conn: sqlite3.Connection) -> None:
+        # Every write method commits through here; inside transaction()
+        # the commit is left to the end of the block (or to commit())
+        if not self._deferred:
+            conn.commit()
+            self._update_word_index()
+
+    @contextmanager
+    def transaction(self):
+        """Runs the calls made inside the block as one transaction.
+
+        Their commits are deferred to the end of the block, which is
+        rolled back if it raises. commit() makes the work done so far
+        durable and carries on in a new transaction."""
+        conn = self._connect()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN")
+        self._deferred = True
+        try:
+            yield self
+        except BaseException:
+            self._deferred = False
+            conn.rollback()
+            self._word_changes.clear()
+            # The current deck may have been created by the undone work
+            name, self.deck = self.deck, None
+            if not self.use_deck(name):
+                self.use_deck()
+            raise
+        self._deferred = False
+        conn.commit()
+        self._update_word_index()
+
+    @property
+    def in_transaction(self) -> bool:
+        """True inside transaction(), where nothing is committed yet."""
+        return self._deferred
+
+    def commit(self) -> None:
+        """Commits the work of the enclosing transaction() so far."""
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.commit()
+            self._update_word_index()
+            if self._deferred:
+                self._conn.execute("BEGIN")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            if self._conn.in_transaction:
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def _words_changed(self, sign: str, words: Collection[str]) -> None:
+        # Records added ("+") or deleted ("-") words of the current deck
+        # for the completion index, written once they are committed
+        if not words or not completion.enabled(self.db_path):
+            return
+        changes = self._word_changes.setdefault(self.deck, [])
+        if changes is not None:
+            changes += [sign + english for english in words]
+            if len(changes) > COMPLETE_LOG_MAX:
+                self._word_changes[self.deck] = None
+
+    def _update_word_index(self) -> None:
+        changes, self._word_changes = self._word_changes, {}
+        for deck, lines in changes.items():
+            try:
+                if (lines is None or completion.log_changes(
+                        self.db_path, deck, lines) > COMPLETE_LOG_MAX):
+                    self.build_word_index(deck)
+            except OSError:
+                pass  # completion is a convenience, never fail a write
+
+    def build_word_index(self, deck: Optional[str] = None) -> OperationResult:
+        """(Re)builds the completion index of deck, or of every deck;
+        this also turns completion on (see completion.py)."""
+        try:
+            completion.index_dir(self.db_path).mkdir(exist_ok=True)
+            with self.get_connection() as conn:
+                decks = (conn.execute("SELECT id, name FROM decks").fetchall()
+                         if deck is None else
+                         conn.execute("SELECT id, name FROM decks WHERE name = ?",
+                                      (deck,)).fetchall())
+                for deck_id, name in decks:
+                    with completion.locked(self.db_path, name):
+                        completion.build(self.db_path, name, (
+                            row[0] for row in conn.execute(
+                                "SELECT english FROM dict WHERE deck_id = ?",
+                                (deck_id,))))
+            return OperationResult(
+                success=True, data=len(decks),
+                message="Completion index built.")
+        except (sqlite3.Error, OSError) as e:
+            return OperationResult(
+                success=False,
+                message=f"Failed to build the completion index: {e}")
 
     def init_database(self) -> OperationResult:
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS dict (
-                        uniq_id  INTEGER PRIMARY KEY AUTOINCREMENT,
-                        english  TEXT,
-                        otherlg  TEXT,  --other language you use
-                        context  TEXT
-                    );
-                    """
-                )
-                conn.commit()
+                version = migrate(conn)
             return OperationResult(
-                success=True, message="Database initialized successfully.")
+                success=True, data=version,
+                message="Database initialized successfully.")
         except sqlite3.Error as e:
             return OperationResult(
                 success=False, message=f"Database initialization failed: {e}")
 
-    # Calculates the maximum word lengths for formatting (caching)
-    def _calculate_max_widths(self) -> Dict[str, int]:
+    def _file_size(self) -> int:
+        # The database file plus its WAL
+        return sum(os.path.getsize(path)
+                   for path in (self.db_path, f"{self.db_path}-wal")
+                   if os.path.exists(path))
+
+    def maintain(self) -> OperationResult:
+        """Checks the database, gives back the space of deleted rows and
+        refreshes the statistics of the query planner.
+
+        data is {"problems": [integrity check messages], "steps":
+        {step: seconds}, "size_before": bytes, "size_after": bytes}.
+        A database older than incremental vacuum is converted by a full
+        VACUUM the first time."""
+        steps = {}
+
+        def step(name, *statements):
+            started = time.perf_counter()
+            for sql in statements:
+                rows = conn.execute(sql).fetchall()
+            steps[name] = time.perf_counter() - started
+            return rows
+
+        data = {"problems": [], "steps": steps,
+                "size_before": self._file_size()}
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
+                if conn.in_transaction:
+                    conn.commit()
+                problems = [row[0] for row in step(
+                    "integrity check", "PRAGMA integrity_check")]
+                if problems != ["ok"]:
+                    # Rewriting a damaged file could lose more of it
+                    data["problems"] = problems
+                    return OperationResult(
+                        success=False, data=data,
+                        message="Integrity check failed, nothing was changed.")
+                # Merge the segments that word changes leave in the FTS5
+                # indexes, before the vacuum gives back the freed pages
+                tables = [row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE name IN "
+                    "('dict_fts', 'dict_trigram')")]
+                step("optimize search indexes", *(
+                    f"INSERT INTO {table} ({table}) VALUES ('optimize')"
+                    for table in tables))
+                conn.commit()
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                    # execute() steps the pragma once, which frees one
+                    # page; executescript() runs it to the end
+                    started = time.perf_counter()
+                    conn.executescript("PRAGMA incremental_vacuum")
+                    steps["incremental vacuum"] = time.perf_counter() - started
+                else:
+                    step("vacuum (switch to incremental)",
+                         "PRAGMA auto_vacuum = INCREMENTAL", "VACUUM")
+                step("analyze", "ANALYZE", "PRAGMA optimize")
+                conn.commit()
+                step("checkpoint", "PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, data=data, message=f"Maintenance failed: {e}")
+        data["size_after"] = self._file_size()
+        return OperationResult(
+            success=True, data=data, message="Maintenance finished.")
+
+    def backup(self, dest: str, step_pages: int = BACKUP_STEP_PAGES,
+               progress: Optional[Callable[[int, int], None]] = None
+               ) -> OperationResult:
+        """Copies the database to dest with the online backup API.
+
+        The copy is made step_pages pages at a time, and other processes
+        (a training session, the daemon) may read and write between the
+        steps. dest is replaced only by a complete copy. progress gets
+        (pages copied, total pages). data is the size of the copy."""
+        partial = f"{dest}.partial"
+
+        def report(status, remaining, total):
+            progress(total - remaining, total)
+
+        try:
+            with self.get_connection() as conn:
+                if conn.in_transaction:
+                    conn.commit()
+                # A write by another connection between two steps would
+                # restart the copy, endlessly under a steady writer. A
+                # read transaction held over all the steps pins one WAL
+                # snapshot instead, and in WAL mode it blocks no writer.
+                conn.execute("BEGIN")
+                conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                target = sqlite3.connect(partial)
+                try:
+                    conn.backup(target, pages=step_pages,
+                                progress=report if progress else None)
+                finally:
+                    target.close()
+                    conn.rollback()
+            os.replace(partial, dest)
+            return OperationResult(
+                success=True, data=os.path.getsize(dest),
+                message=f"Database copied to {dest}.")
+        except (sqlite3.Error, OSError) as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            return OperationResult(
+                success=False, message=f"Backup failed: {e}")
+
+    def refresh(self) -> None:
+        """Reloads the cached stats if another connection has committed
+        since the last call (for long-lived processes)."""
+        with self.get_connection() as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._load_stats()
+
+    def use_deck(self, name: Optional[str] = None,
+                 create: bool = False) -> OperationResult:
+        """Makes name (None for the default deck) the current deck; with
+        create a missing deck is created. data is the deck id."""
+        name = name or DEFAULT_DECK
+        if name == self.deck:
+            return OperationResult(success=True, data=self.deck_id)
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT id FROM decks WHERE name = ?", (name,)).fetchone()
+                if row is None and not create:
+                    return OperationResult(
+                        success=False, message=f"Deck \'{name}\' not found.")
+                if row is None:
+                    deck_id = conn.execute(
+                        "INSERT INTO decks (name) VALUES (?)", (name,)
+                    ).lastrowid
+                    self._commit(conn)
+                else:
+                    deck_id = row["id"]
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to open deck \'{name}\': {e}")
+        self.deck, self.deck_id = name, deck_id
+        self._load_stats()
+        return OperationResult(
+            success=True, data=deck_id, message=f"Deck \'{name}\' selected.")
+
+    def get_decks(self) -> OperationResult:
+        """All decks with their word counts, by name."""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
                     """
-                    SELECT 
-                        MAX(LENGTH(english)) as max_eng,
-                        MAX(LENGTH(otherlg)) as max_rus
-                    FROM dict
+                    SELECT decks.name, IFNULL(s.num_entries, 0) AS num_entries
+                    FROM decks LEFT JOIN deck_stats AS s ON s.deck_id = decks.id
+                    ORDER BY decks.name
                     """
-                )
-                result = cursor.fetchone()
-                return { 
-                    "english": result["max_eng"] or 10,
-                    "russian": result["max_rus"] or 10
-                    }
+                ).fetchall()
+                return OperationResult(
+                    success=True, data=[dict(row) for row in rows],
+                    message="Decks retrieved successfully.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to retrieve decks: {e}")
+
+    # Reads the trigger-maintained counters of the current deck (caching)
+    def _load_stats(self) -> None:
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    """
+                    SELECT num_entries, max_english, max_otherlg, stale
+                    FROM deck_stats WHERE deck_id = ?
+                    """,
+                    (self.deck_id,),
+                ).fetchone()
+                if row is not None and row["stale"]:
+                    row = self._recalculate_stats(conn)
         except sqlite3.Error:
-            return {"english": 10, "russian": 10}  # fallback values
+            return  # keep the previous (or fallback) values
+        if row is None:
+            return
+        self._max_widths = {
+            "english": row["max_english"] or 10,
+            "russian": row["max_otherlg"] or 10,
+            }
+        self._num_of_entries = row["num_entries"]
+
+    # The longest word was deleted or shortened: find the new maximum
+    def _recalculate_stats(self, conn: sqlite3.Connection) -> sqlite3.Row:
+        conn.execute(
+            """
+            UPDATE deck_stats SET
+                max_english = (SELECT IFNULL(MAX(LENGTH(english)), 0)
+                               FROM dict WHERE deck_id = :deck),
+                max_otherlg = (SELECT IFNULL(MAX(LENGTH(otherlg)), 0)
+                               FROM dict WHERE deck_id = :deck),
+                stale = 0
+            WHERE deck_id = :deck
+            """,
+            {"deck": self.deck_id},
+        )
+        self._commit(conn)
+        return conn.execute(
+            """
+            SELECT num_entries, max_english, max_otherlg, stale
+            FROM deck_stats WHERE deck_id = ?
+            """,
+            (self.deck_id,),
+        ).fetchone()
 
     def get_max_widths(self) -> Dict[str, int]:
         return self._max_widths.copy()
 
-    # Updates the cache if new words are longer than the current maximum
+    # Rereads the widths after data changes
     def invalidate_width_cache(self):
-        self._max_widths = self._calculate_max_widths()
+        self._load_stats()
 
     def add_word(
-            self, english: str, otherlg: str, context: str = None) -> OperationResult:
+            self, english: str, otherlg: str, context: str = None,
+            enqueue_context: bool = False) -> OperationResult:
+        """Adds a word; with enqueue_context it is also queued for an AI
+        context in the same transaction. data is the new uniq_id."""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                # Check if word already exists
+                # The UNIQUE (deck_id, english) index turns the duplicate
+                # check and the insert into one atomic statement
                 cursor.execute(
                     """
-                    SELECT 1 FROM dict 
-                    WHERE english = ?
+                    INSERT INTO dict (deck_id, english, otherlg, context,
+                                      english_cf, otherlg_cf)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(deck_id, english) DO NOTHING
                     """,
-                    (english,)
+                    (self.deck_id, english, otherlg, context,
+                     casefold(english), casefold(otherlg)),
                 )
-                if cursor.fetchone():
+                if cursor.rowcount == 0:
+                    self._commit(conn)
                     return OperationResult(
                         success=False, message="Word already exists")
+                uniq_id = cursor.lastrowid
+                if enqueue_context:
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO ai_queue (word_id, next_try) "
+                        "VALUES (?, ?)",
+                        (uniq_id, time.time()),
+                    )
+                self._words_changed("+", [english])
+                self._commit(conn)
 
-                cursor.execute(
-                    """
-                    INSERT INTO dict (english, otherlg, context) 
-                    VALUES (?, ?, ?)
-                    """,
-                    (english, otherlg, context),
-                )
-                conn.commit()
-
-                # Update the cache if new words are longer than the current maximum
-                if (
-                    len(english) > self._max_widths["english"]
-                    or len(otherlg) > self._max_widths["russian"]
-                ):
-                    self.invalidate_width_cache()
-                self.invalidate_num_of_entries_cache()
+                self._load_stats()
 
-                return OperationResult(success=True, message="Word added successfully")
+                return OperationResult(
+                    success=True, data=uniq_id, message="Word added successfully")
         except sqlite3.Error as e:
             return OperationResult(success=False, message=f"Failed to add word: {e}")
 
@@ -139,8 +513,8 @@ class VocabularyDB:
                 updates = []
                 params = []
                 if new_otherlg is not None:
-                    updates.append("otherlg = ?")
-                    params.append(new_otherlg)
+                    updates.append("otherlg = ?, otherlg_cf = ?")
+                    params += [new_otherlg, casefold(new_otherlg)]
                 if new_context is not None:
                     updates.append("context = ?")
                     params.append(new_context)
@@ -149,11 +523,12 @@ class VocabularyDB:
                     return OperationResult(
                         success=False, message="No new values provided for update.")
 
-                sql = f"UPDATE dict SET {', '.join(updates)} WHERE english = ?"
-                params.append(english)
+                sql = (f"UPDATE dict SET {', '.join(updates)} "
+                       "WHERE deck_id = ? AND english = ?")
+                params += [self.deck_id, english]
 
                 cursor.execute(sql, tuple(params))
-                conn.commit()
+                self._commit(conn)
 
                 if cursor.rowcount > 0:
                     self.invalidate_width_cache()
@@ -172,11 +547,13 @@ class VocabularyDB:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
-                    DELETE FROM dict WHERE english = ?
+                    DELETE FROM dict WHERE deck_id = ? AND english = ?
                     """,
-                    (english,),
+                    (self.deck_id, english),
                 )
-                conn.commit()
+                if cursor.rowcount > 0:
+                    self._words_changed("-", [english])
+                self._commit(conn)
                 self.invalidate_num_of_entries_cache()
                 if cursor.rowcount > 0:
                     return OperationResult(
@@ -188,24 +565,125 @@ class VocabularyDB:
             return OperationResult(
                 success=False, message=f"Failed to delete word \'{english}\': {e}")
 
-    # Calculates the number of entries (caching)
-    def _calculate_num_of_entries(self) -> int:
+    # The WHERE clause of a bulk selection in the current deck: listed
+    # words go through a temp table, so any number of them fits one
+    # statement; a prefix (case-insensitive like -s) or a GLOB pattern
+    def _selection(self, conn: sqlite3.Connection,
+                   words: Optional[Iterable[str]], prefix: Optional[str],
+                   pattern: Optional[str]) -> tuple:
+        if words is not None:
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS selected "
+                "(english TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.execute("DELETE FROM temp.selected")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.selected (english) VALUES (?)",
+                ((word,) for word in words))
+            return ("deck_id = ? AND english IN "
+                    "(SELECT english FROM temp.selected)", [self.deck_id])
+        if prefix is not None:
+            where, params = prefix_range("english_cf", prefix)
+            return f"deck_id = ? AND {where}", [self.deck_id] + params
+        return "deck_id = ? AND english GLOB ?", [self.deck_id, pattern]
+
+    def _missing(self, conn: sqlite3.Connection) -> list:
+        # Listed words (see _selection) that are not in the current deck
+        return [row[0] for row in conn.execute(
+            """
+            SELECT s.english FROM temp.selected AS s
+            WHERE NOT EXISTS (SELECT 1 FROM dict
+                              WHERE deck_id = ? AND english = s.english)
+            ORDER BY s.english
+            """,
+            (self.deck_id,))]
+
+    def select_words(self, words: Optional[Iterable[str]] = None,
+                     prefix: Optional[str] = None,
+                     pattern: Optional[str] = None) -> OperationResult:
+        """The words a bulk delete/edit with the same arguments would touch.
+
+        data is {"matched": [english...], "missing": [listed words that
+        do not exist]}."""
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM dict")
-                result = cursor.fetchone()
-                return result[0]
-        except sqlite3.Error:
-            return 0
+                where, params = self._selection(conn, words, prefix, pattern)
+                matched = [row[0] for row in conn.execute(
+                    f"SELECT english FROM dict WHERE {where} ORDER BY english",
+                    params)]
+                missing = self._missing(conn) if words is not None else []
+                self._commit(conn)
+                return OperationResult(
+                    success=True, data={"matched": matched, "missing": missing},
+                    message=f"{len(matched)} words selected.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to select words: {e}")
+
+    def delete_words(self, words: Optional[Iterable[str]] = None,
+                     prefix: Optional[str] = None,
+                     pattern: Optional[str] = None) -> OperationResult:
+        """Deletes the listed words, or those matching prefix or the GLOB
+        pattern, with one statement in one transaction.
+
+        data is {"count": deleted, "missing": [listed words not found]}."""
+        try:
+            with self.get_connection() as conn:
+                where, params = self._selection(conn, words, prefix, pattern)
+                missing = self._missing(conn) if words is not None else []
+                deleted = ([row[0] for row in conn.execute(
+                    f"SELECT english FROM dict WHERE {where}", params)]
+                    if completion.enabled(self.db_path) else [])
+                count = conn.execute(
+                    f"DELETE FROM dict WHERE {where}", params).rowcount
+                self._words_changed("-", deleted)
+                self._commit(conn)
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to delete words: {e}")
+        self._load_stats()
+        return OperationResult(
+            success=True, data={"count": count, "missing": missing},
+            message=f"{count} words deleted.")
+
+    def edit_words(self, new_otherlg: Optional[str] = None,
+                   new_context: Optional[str] = None,
+                   words: Optional[Iterable[str]] = None,
+                   prefix: Optional[str] = None,
+                   pattern: Optional[str] = None) -> OperationResult:
+        """edit_word for many words at once, selected like delete_words."""
+        updates, values = [], []
+        if new_otherlg is not None:
+            updates.append("otherlg = ?, otherlg_cf = ?")
+            values += [new_otherlg, casefold(new_otherlg)]
+        if new_context is not None:
+            updates.append("context = ?")
+            values.append(new_context)
+        if not updates:
+            return OperationResult(
+                success=False, message="No new values provided for update.")
+        try:
+            with self.get_connection() as conn:
+                where, params = self._selection(conn, words, prefix, pattern)
+                missing = self._missing(conn) if words is not None else []
+                count = conn.execute(
+                    f"UPDATE dict SET {', '.join(updates)} WHERE {where}",
+                    values + params).rowcount
+                self._commit(conn)
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to update words: {e}")
+        self._load_stats()
+        return OperationResult(
+            success=True, data={"count": count, "missing": missing},
+            message=f"{count} words updated.")
 
     # Returns cached number of entries
     def get_num_of_entries(self) -> int:
         return self._num_of_entries
 
-    # Updates the cache after data changes
+    # Rereads the counter after data changes
     def invalidate_num_of_entries_cache(self):
-        self._num_of_entries = self._calculate_num_of_entries()
+        self._load_stats()
 
     def get_word(self, english: str) -> OperationResult:
         try:
@@ -215,9 +693,9 @@ class VocabularyDB:
                     """
                     SELECT english, otherlg, context
                     FROM dict
-                    WHERE english = ?
+                    WHERE deck_id = ? AND english = ?
                     """,
-                    (english,),
+                    (self.deck_id, english),
                 )
                 row = cursor.fetchone()
                 if row:
@@ -238,10 +716,12 @@ class VocabularyDB:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
-                    SELECT english, otherlg, context 
+                    SELECT english, otherlg, context
                     FROM dict
+                    WHERE deck_id = ?
                     ORDER by english;
-                    """
+                    """,
+                    (self.deck_id,),
                 )
                 words = [dict(row) for row in cursor.fetchall()]
                 return OperationResult(
@@ -252,21 +732,72 @@ class VocabularyDB:
             return OperationResult(
                 success=False, message=f"Failed to retrieve all words: {e}")
 
-    def search_words(self, prefix: str) -> OperationResult:
+    def iter_words(self, prefix: Optional[str] = None,
+                   chunk_size: int = 1000,
+                   reverse: bool = False) -> OperationResult:
+        """Like get_all_words/search_words, but data is a lazy iterator.
+
+        Rows are pulled from the cursor chunk_size at a time, so even a
+        huge dictionary is walked in bounded memory."""
+        try:
+            with self.get_connection() as conn:
+                if prefix is None:
+                    cursor = conn.execute(
+                        """
+                        SELECT english, otherlg, context
+                        FROM dict
+                        WHERE deck_id = ?
+                        ORDER BY english
+                        """,
+                        (self.deck_id,),
+                    )
+                else:
+                    column = "otherlg_cf" if reverse else "english_cf"
+                    where, params = prefix_range(column, prefix)
+                    cursor = conn.execute(
+                        f"""
+                        SELECT english, otherlg, context
+                        FROM dict
+                        WHERE deck_id = ? AND {where}
+                        ORDER BY {column}, english
+                        """,
+                        [self.deck_id, *params],
+                    )
+                return OperationResult(
+                    success=True,
+                    data=self._stream(cursor, chunk_size),
+                    message="Words are being streamed.",)
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to retrieve words: {e}")
+
+    @staticmethod
+    def _stream(cursor: sqlite3.Cursor, chunk_size: int):
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+    def search_words(self, prefix: str, reverse: bool = False) -> OperationResult:
+        """Words starting with prefix, in any letter case; with reverse,
+        the words whose translation starts with it."""
+        column = "otherlg_cf" if reverse else "english_cf"
+        where, params = prefix_range(column, prefix)
         try:
             with self.get_connection() as conn:
                 cur = conn.cursor()
                 cur.execute(
-                    """
+                    f"""
                     SELECT uniq_id,
                         english,
                         otherlg,
                         context
                     FROM dict
-                    WHERE english LIKE ? COLLATE NOCASE
-                    ORDER BY english COLLATE NOCASE
+                    WHERE deck_id = ? AND {where}
+                    ORDER BY {column}, english
                     """,
-                    (f"{prefix}%",),
+                    [self.deck_id, *params],
                 )
                 columns = [col[0] for col in cur.description]
                 words = [dict(zip(columns, row)) for row in cur.fetchall()]
@@ -279,4 +810,632 @@ class VocabularyDB:
                 success=False,
                 message=f"Failed to search words with prefix \'{prefix}\': {e}",)
 
+    def import_words(
+            self, rows: Iterable[tuple], on_conflict: str = "skip",
+            batch_size: int = 5000,
+            progress: Optional[Callable[[int, int, float], None]] = None
+            ) -> OperationResult:
+        """Inserts (english, otherlg, context) rows into the current deck
+        in one transaction.
+
+        Rows are consumed lazily in batches of batch_size, so memory does
+        not depend on the input size. on_conflict decides what happens to
+        words that already exist: skip them, overwrite their translation
+        (and context, when the row has one), or fail and roll the whole
+        import back.
+        """
+        if on_conflict not in CONFLICT_POLICIES:
+            return OperationResult(
+                success=False, message=f"Unknown conflict policy '{on_conflict}'")
+
+        sql = ("INSERT INTO dict (deck_id, english, otherlg, context,"
+               " english_cf, otherlg_cf) VALUES (?, ?, ?, ?, ?, ?)")
+        if on_conflict == "skip":
+            sql += " ON CONFLICT(deck_id, english) DO NOTHING"
+        elif on_conflict == "overwrite":
+            sql += (" ON CONFLICT(deck_id, english) DO UPDATE SET"
+                    " otherlg = excluded.otherlg,"
+                    " otherlg_cf = excluded.otherlg_cf,"
+                    " context = IFNULL(excluded.context, context)")
+
+        stats = {"read": 0, "written": 0, "invalid": 0}
+
+        def valid(source):
+            for english, otherlg, context in source:
+                stats["read"] += 1
+                if not english or not otherlg:
+                    stats["invalid"] += 1
+                    continue
+                if logged is not None:
+                    logged.append(english)
+                yield (self.deck_id, english, otherlg, context,
+                       casefold(english), casefold(otherlg))
+
+        # Words for the completion index; a big import rebuilds it instead
+        logged = [] if completion.enabled(self.db_path) else None
+        started = time.perf_counter()
+        batch = None
+        try:
+            with self.get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                valid_rows = valid(rows)
+                while True:
+                    batch = list(islice(valid_rows, batch_size))
+                    if not batch:
+                        break
+                    cursor = conn.executemany(sql, batch)
+                    stats["written"] += cursor.rowcount
+                    if progress:
+                        progress(stats["read"], stats["written"],
+                                 time.perf_counter() - started)
+                    if logged is not None and len(logged) > COMPLETE_LOG_MAX:
+                        self._word_changes[self.deck] = None
+                        logged = None
+                if logged is not None and stats["written"]:
+                    self._words_changed("+", logged)
+                conn.commit()
+                self._update_word_index()
+        except sqlite3.IntegrityError as e:
+            clash = self._find_existing(batch or [])
+            detail = f": '{clash}' already exists" if clash else f": {e}"
+            return OperationResult(
+                success=False, data=stats,
+                message=f"Import rolled back{detail}")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, data=stats, message=f"Import failed: {e}")
+        finally:
+            self._load_stats()
+
+        stats["skipped"] = stats["read"] - stats["invalid"] - stats["written"]
+        stats["seconds"] = time.perf_counter() - started
+        return OperationResult(
+            success=True, data=stats, message="Import finished successfully.")
+
+    # First word of a failed batch that is already stored (or repeated)
+    def _find_existing(self, batch: list) -> Optional[str]:
+        seen = set()
+        try:
+            with self.get_connection() as conn:
+                for _, english, *_ in batch:
+                    if english in seen or conn.execute(
+                            "SELECT 1 FROM dict WHERE deck_id = ? AND english = ?",
+                            (self.deck_id, english)).fetchone():
+                        return english
+                    seen.add(english)
+        except sqlite3.Error:
+            pass
+        return None
+
+    def full_text_search(
+            self, query: str, limit: int = 50,
+            marks: tuple = ("[", "]")) -> OperationResult:
+        """Ranked FTS5 search over english, otherlg and context.
+
+        query uses the FTS5 syntax: words, "phrases", prefix*, AND/OR/NOT.
+        Matches are wrapped in marks; data rows carry the highlighted
+        english/otherlg and a snippet of the context."""
+        sql = """
+            SELECT d.english, d.otherlg, d.context,
+                   highlight(dict_fts, 0, :open, :close) AS english_hl,
+                   highlight(dict_fts, 1, :open, :close) AS otherlg_hl,
+                   snippet(dict_fts, 2, :open, :close, '…', 12) AS context_hl
+            FROM dict_fts
+            JOIN dict AS d ON d.uniq_id = dict_fts.rowid
+            WHERE dict_fts MATCH :query AND d.deck_id = :deck
+            ORDER BY bm25(dict_fts, 10.0, 5.0, 1.0)
+            LIMIT :limit
+            """
+        params = {"open": marks[0], "close": marks[1], "limit": limit,
+                  "deck": self.deck_id}
+        try:
+            with self.get_connection() as conn:
+                try:
+                    rows = conn.execute(sql, dict(params, query=query)).fetchall()
+                except sqlite3.OperationalError as e:
+                    if "no such table" in str(e):
+                        return OperationResult(
+                            success=False,
+                            message="The full-text index is not available: "
+                                    "this SQLite was built without FTS5. It is "
+                                    "created on the first run with an SQLite "
+                                    "that has it.")
+                    # Not valid FTS5 syntax (e.g. "don't"): search the words
+                    # as plain quoted terms instead
+                    plain = " ".join(
+                        '"' + term.replace('"', '""') + '"'
+                        for term in query.split())
+                    rows = conn.execute(sql, dict(params, query=plain)).fetchall()
+                return OperationResult(
+                    success=True,
+                    data=[dict(row) for row in rows],
+                    message=f"Full-text search for \'{query}\' finished.",)
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Full-text search failed: {e}")
+
+    def fuzzy_search(self, word: str, limit: int = 10,
+                     translations: bool = False) -> OperationResult:
+        """Words within a few typos of word, closest first.
+
+        Candidates sharing the rarest trigrams of word are pulled from the
+        trigram index and ranked by edit distance, so the cost depends on
+        the word, not on the dictionary size. With translations=True the
+        otherlg column is searched as well."""
+        columns = "{english otherlg}" if translations else "{english}"
+        limit_typos = max_typos(word)
+        try:
+            with self.get_connection() as conn:
+                rows = self._trigram_candidates(
+                    conn, word, columns, self.deck_id)
+                # One typo in a short word can break all of its trigrams:
+                # also look at words of similar length with the same start
+                if len(word) <= 8:
+                    rows += self._prefix_candidates(
+                        conn, word, limit_typos, self.deck_id)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return OperationResult(
+                    success=False,
+                    message="The fuzzy search index is not available: it "
+                            "needs SQLite 3.34 or newer, built with FTS5. "
+                            "It is created on the first run with one.")
+            return OperationResult(
+                success=False, message=f"Fuzzy search failed: {e}")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Fuzzy search failed: {e}")
+
+        matches = []
+        seen = set()
+        for row in rows:
+            if row["uniq_id"] in seen:
+                continue
+            seen.add(row["uniq_id"])
+            distance = edit_distance(word, row["english"], limit_typos)
+            if translations:
+                distance = min(distance, edit_distance(
+                    word, row["otherlg"], limit_typos))
+            if distance <= limit_typos:
+                matches.append(dict(row, distance=distance))
+        matches.sort(key=lambda m: (m["distance"], m["english"]))
+        return OperationResult(
+            success=True, data=matches[:limit],
+            message=f"Fuzzy search for \'{word}\' finished.")
+
+    @staticmethod
+    def _trigram_candidates(conn: sqlite3.Connection, word: str,
+                            columns: str, deck_id: int) -> list:
+        grams = trigrams(word)
+        if not grams:
+            return []
+        counts = {
+            term: doc for term, doc in conn.execute(
+                "SELECT term, doc FROM dict_trigram_vocab "
+                f"WHERE term IN ({', '.join('?' * len(grams))})",
+                grams)}
+        # Rarest trigrams first, until their posting lists get too long
+        chosen, postings = [], 0
+        for gram in sorted(counts, key=counts.get):
+            if (len(chosen) >= FUZZY_MIN_GRAMS
+                    and postings + counts[gram] > FUZZY_POSTING_BUDGET):
+                break
+            chosen.append(gram)
+            postings += counts[gram]
+        if not chosen:
+            return []
+
+        query = columns + " : (" + " OR ".join(
+            '"' + gram.replace('"', '""') + '"' for gram in chosen) + ")"
+        return conn.execute(
+            """
+            SELECT d.uniq_id, d.english, d.otherlg, d.context
+            FROM dict_trigram
+            JOIN dict AS d ON d.uniq_id = dict_trigram.rowid
+            WHERE dict_trigram MATCH ? AND d.deck_id = ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (query, deck_id, FUZZY_CANDIDATES),
+        ).fetchall()
+
+    @staticmethod
+    def _prefix_candidates(conn: sqlite3.Connection, word: str,
+                           limit_typos: int, deck_id: int) -> list:
+        # Index range scan over the (deck_id, english_cf) index
+        where, params = prefix_range("english_cf", word[:2])
+        return conn.execute(
+            f"""
+            SELECT uniq_id, english, otherlg, context
+            FROM dict
+            WHERE deck_id = ? AND {where}
+              AND LENGTH(english) BETWEEN ? AND ?
+            LIMIT ?
+            """,
+            [deck_id, *params, len(word) - limit_typos,
+             len(word) + limit_typos, FUZZY_CANDIDATES * 10],
+        ).fetchall()
+
+    def get_due_cards(self, limit: int, now: Optional[float] = None,
+                      after: Optional[Sequence[int]] = None) -> OperationResult:
+        """Up to limit cards of the current deck, the most overdue first
+        (new words, due = 0, before all): data holds (uniq_id,
+        interval_days, ease, reps, due) tuples without the texts, in
+        (due, uniq_id) order. With now set only cards due by then are
+        returned.
+
+        Pass the (due, uniq_id) of the last card seen as after to get the
+        next page; a long session does not have to list its words."""
+        params = {"deck": self.deck_id, "limit": limit,
+                  "now": None if now is None else int(now)}
+        due_by_now = "" if now is None else "AND due <= :now"
+        columns = "uniq_id, interval_days, ease, reps, due"
+        if after is None:
+            sql = f"""
+                SELECT {columns} FROM dict
+                WHERE deck_id = :deck {due_by_now}
+                ORDER BY due, uniq_id
+                LIMIT :limit
+                """
+        elif now is not None and after[0] > now:
+            return OperationResult(
+                success=True, data=[], message="No more due cards.")
+        else:
+            # Two index seeks merged in order: the rest of the cards due
+            # with the last one (all new words share due = 0), then the
+            # later ones. A (due, uniq_id) > (?, ?) row value would only
+            # seek on due and rescan the equal ones for every page.
+            params.update(due=after[0], id=after[1])
+            sql = f"""
+                SELECT {columns} FROM dict
+                WHERE deck_id = :deck AND due = :due AND uniq_id > :id
+                UNION ALL
+                SELECT {columns} FROM dict
+                WHERE deck_id = :deck AND due > :due {due_by_now}
+                ORDER BY due, uniq_id
+                LIMIT :limit
+                """
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(sql, params).fetchall()
+                return OperationResult(
+                    success=True, data=[tuple(row) for row in rows],
+                    message="Due cards retrieved successfully.",)
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to retrieve due cards: {e}")
+
+    def get_card(self, uniq_id: int) -> OperationResult:
+        """The (english, otherlg, context) of a word, by its id."""
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT english, otherlg, context FROM dict WHERE uniq_id = ?",
+                    (uniq_id,),
+                ).fetchone()
+                if row is None:
+                    return OperationResult(
+                        success=False, message="The word no longer exists.")
+                return OperationResult(
+                    success=True, data=tuple(row), message="Card retrieved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to retrieve the card: {e}")
+
+    def record_reviews(self, reviews: Sequence[tuple],
+                       schedules: Dict[int, Schedule]) -> OperationResult:
+        """Saves training answers and schedule changes in one transaction.
+
+        reviews holds (word_id, reviewed_at, correct, grade, latency_ms)."""
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO review_log
+                        (word_id, reviewed_at, correct, grade, latency_ms)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    reviews,
+                )
+                conn.executemany(
+                    """
+                    UPDATE dict
+                    SET interval_days = ?, ease = ?, reps = ?, due = ?
+                    WHERE uniq_id = ?
+                    """,
+                    [(*schedule, word_id)
+                     for word_id, schedule in schedules.items()],
+                )
+                self._commit(conn)
+                return OperationResult(
+                    success=True, message=f"{len(reviews)} reviews saved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to save reviews: {e}")
+
+    def count_missing_context(self) -> OperationResult:
+        """data is the number of words without a context, in every deck."""
+        try:
+            with self.get_connection() as conn:
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM dict WHERE context IS NULL OR context = ''"
+                ).fetchone()[0]
+                return OperationResult(
+                    success=True, data=count,
+                    message=f"{count} words without context.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False,
+                message=f"Failed to count words without context: {e}")
+
+    def get_missing_context(self, after_id: int = 0,
+                            limit: int = 100) -> OperationResult:
+        """Up to limit (uniq_id, english) rows without a context, by id.
+
+        Pass the last uniq_id seen as after_id to get the next chunk;
+        rows that stay empty are not returned again."""
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT uniq_id, english FROM dict
+                    WHERE uniq_id > ? AND (context IS NULL OR context = '')
+                    ORDER BY uniq_id
+                    LIMIT ?
+                    """,
+                    (after_id, limit),
+                ).fetchall()
+                return OperationResult(
+                    success=True, data=[tuple(row) for row in rows],
+                    message="Words without context retrieved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False,
+                message=f"Failed to retrieve words without context: {e}")
+
+    def fill_contexts(self, contexts: Sequence[tuple]) -> OperationResult:
+        """Sets (uniq_id, context) pairs in one transaction.
+
+        A context the user wrote in the meantime is kept."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.executemany(
+                    """
+                    UPDATE dict SET context = ?
+                    WHERE uniq_id = ? AND (context IS NULL OR context = '')
+                    """,
+                    [(context, uniq_id) for uniq_id, context in contexts],
+                )
+                self._commit(conn)
+                return OperationResult(
+                    success=True, data=cursor.rowcount,
+                    message=f"{cursor.rowcount} contexts saved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to save contexts: {e}")
 
+    def count_queued(self, now: Optional[float] = None) -> OperationResult:
+        """data is the number of words waiting for an AI context; with
+        now, only of those due."""
+        try:
+            with self.get_connection() as conn:
+                if now is None:
+                    count = conn.execute(
+                        "SELECT COUNT(*) FROM ai_queue").fetchone()[0]
+                else:
+                    count = conn.execute(
+                        "SELECT COUNT(*) FROM ai_queue WHERE next_try <= ?",
+                        (now,)).fetchone()[0]
+                return OperationResult(
+                    success=True, data=count, message=f"{count} words queued.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to count queued words: {e}")
+
+    def get_queued(self, after_id: int = 0, limit: int = 100,
+                   now: Optional[float] = None) -> OperationResult:
+        """Up to limit queued (uniq_id, english) rows after after_id, by id.
+
+        With now set only rows due by then are returned. Rows whose word
+        got a context in the meantime are dropped from the queue."""
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    """
+                    DELETE FROM ai_queue WHERE word_id IN (
+                        SELECT q.word_id FROM ai_queue AS q
+                        JOIN dict AS d ON d.uniq_id = q.word_id
+                        WHERE d.context IS NOT NULL AND d.context != '')
+                    """
+                )
+                self._commit(conn)
+                rows = conn.execute(
+                    """
+                    SELECT d.uniq_id, d.english
+                    FROM ai_queue AS q
+                    JOIN dict AS d ON d.uniq_id = q.word_id
+                    WHERE q.word_id > ? AND q.next_try <= ?
+                    ORDER BY q.word_id
+                    LIMIT ?
+                    """,
+                    (after_id, float("inf") if now is None else now, limit),
+                ).fetchall()
+                return OperationResult(
+                    success=True, data=[tuple(row) for row in rows],
+                    message="Queued words retrieved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to read the AI queue: {e}")
+
+    def finish_queued(self, contexts: Sequence[tuple]) -> OperationResult:
+        """Saves (uniq_id, context) pairs and takes the words off the queue."""
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    """
+                    UPDATE dict SET context = ?
+                    WHERE uniq_id = ? AND (context IS NULL OR context = '')
+                    """,
+                    [(context, uniq_id) for uniq_id, context in contexts],
+                )
+                conn.executemany(
+                    "DELETE FROM ai_queue WHERE word_id = ?",
+                    [(uniq_id,) for uniq_id, _ in contexts],
+                )
+                self._commit(conn)
+                return OperationResult(
+                    success=True, message=f"{len(contexts)} contexts saved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to save contexts: {e}")
+
+    def retry_queued(self, word_ids: Sequence[int], base_delay: float,
+                     max_attempts: int) -> OperationResult:
+        """Reschedules failed words with exponential backoff; a word that
+        failed max_attempts times is taken off the queue.
+
+        data is the number of words given up on."""
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    """
+                    UPDATE ai_queue
+                    SET attempts = attempts + 1,
+                        next_try = ? + ? * (1 << MIN(attempts, 16))
+                    WHERE word_id = ?
+                    """,
+                    [(now, base_delay, word_id) for word_id in word_ids],
+                )
+                dropped = conn.execute(
+                    "DELETE FROM ai_queue WHERE attempts >= ?", (max_attempts,)
+                ).rowcount
+                self._commit(conn)
+                return OperationResult(
+                    success=True, data=dropped,
+                    message=f"{len(word_ids)} words rescheduled.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to reschedule words: {e}")
+
+    def get_cached_context(self, word: str, model: str, prompt_version: int,
+                           ttl_days: float) -> OperationResult:
+        """A cached AI context younger than ttl_days; data is None on a miss.
+
+        Only reads: the counters and the last use are kept in memory
+        until put_cached_contexts()."""
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    """
+                    SELECT context FROM ai_cache
+                    WHERE word = ? AND model = ? AND prompt_version = ?
+                      AND created_at >= ?
+                    """,
+                    (word, model, prompt_version, now - ttl_days * 86400),
+                ).fetchone()
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to read the AI cache: {e}")
+        if row:
+            self._cache_hits += 1
+            self._cache_used[(word, model, prompt_version)] = now
+        else:
+            self._cache_misses += 1
+        return OperationResult(
+            success=True, data=row["context"] if row else None,
+            message="Cache hit." if row else "Cache miss.")
+
+    def put_cached_contexts(self, contexts: Sequence[tuple], model: str,
+                            prompt_version: int,
+                            max_entries: int) -> OperationResult:
+        """Caches (word, context) pairs in one transaction, together with
+        the lookups counted since, and evicts the least recently used
+        entries beyond max_entries."""
+        if not contexts and not self._cache_hits + self._cache_misses:
+            return OperationResult(success=True, message="Nothing to cache.")
+        now = time.time()
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO ai_cache
+                        (word, model, prompt_version, context,
+                         created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (word, model, prompt_version) DO UPDATE SET
+                        context = excluded.context,
+                        created_at = excluded.created_at,
+                        last_used = excluded.last_used
+                    """,
+                    [(word, model, prompt_version, context, now, now)
+                     for word, context in contexts],
+                )
+                conn.executemany(
+                    """
+                    UPDATE ai_cache SET last_used = MAX(last_used, ?)
+                    WHERE word = ? AND model = ? AND prompt_version = ?
+                    """,
+                    [(used, *key) for key, used in self._cache_used.items()],
+                )
+                conn.execute(
+                    """
+                    UPDATE ai_cache_stats
+                    SET hits = hits + ?, misses = misses + ?
+                    WHERE id = 1
+                    """,
+                    (self._cache_hits, self._cache_misses),
+                )
+                excess = conn.execute(
+                    "SELECT entries FROM ai_cache_stats WHERE id = 1"
+                ).fetchone()[0] - max_entries
+                if excess > 0:
+                    conn.execute(
+                        """
+                        DELETE FROM ai_cache
+                        WHERE (word, model, prompt_version) IN (
+                            SELECT word, model, prompt_version FROM ai_cache
+                            ORDER BY last_used LIMIT ?)
+                        """,
+                        (excess,),
+                    )
+                self._commit(conn)
+                self._cache_hits = self._cache_misses = 0
+                self._cache_used.clear()
+                return OperationResult(
+                    success=True, message=f"{len(contexts)} contexts cached.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to write the AI cache: {e}")
+
+    def purge_context_cache(self) -> OperationResult:
+        try:
+            with self.get_connection() as conn:
+                removed = conn.execute("DELETE FROM ai_cache").rowcount
+                conn.execute(
+                    "UPDATE ai_cache_stats SET hits = 0, misses = 0 WHERE id = 1")
+                self._commit(conn)
+                self._cache_hits = self._cache_misses = 0
+                self._cache_used.clear()
+                return OperationResult(
+                    success=True, data=removed, message="AI cache purged.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to purge the AI cache: {e}")
+
+    def get_context_cache_stats(self) -> OperationResult:
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    "SELECT entries, hits, misses FROM ai_cache_stats "
+                    "WHERE id = 1").fetchone()
+                return OperationResult(
+                    success=True,
+                    data={"entries": row["entries"],
+                          "hits": row["hits"] + self._cache_hits,
+                          "misses": row["misses"] + self._cache_misses},
+                    message="AI cache statistics retrieved.")
+        except sqlite3.Error as e:
+            return OperationResult(
+                success=False, message=f"Failed to read the AI cache: {e}")
@@ -0,0 +1,53 @@
+from typing import List, Optional
+
+# Helpers for typo-tolerant lookup. Candidates come from the trigram index
+# (dict_trigram, see migrations.py) and are ranked here by edit distance.
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct trigrams of text, in order of appearance."""
+    text = text.casefold()
+    seen = []
+    for i in range(len(text) - 2):
+        gram = text[i:i + 3]
+        if gram not in seen:
+            seen.append(gram)
+    return seen
+
+
+def max_typos(word: str) -> int:
+    """How many edits still count as "the same word" for a word this long."""
+    if len(word) <= 4:
+        return 1
+    if len(word) <= 8:
+        return 2
+    return 3
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Optimal string alignment distance (Levenshtein + transpositions).
+
+    With limit set, gives up early and returns limit + 1 as soon as
+    the distance is known to be larger."""
+    a, b = a.casefold(), b.casefold()
+    if a == b:
+        return 0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1,         # deletion
+                             current[j - 1] + 1,      # insertion
+                             previous[j - 1] + cost)  # substitution
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
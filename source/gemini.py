@@ -0,0 +1,149 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait)
+from typing import Iterable, Iterator, Optional, Tuple
+from settings import get_config
+
+API_URL = ("https://generativelanguage.googleapis.com"
+           "/v1beta/models/gemini-1.5-flash:generateContent")
+MODEL = "gemini-1.5-flash"
+# Bump when the prompt changes, so cached contexts of the old prompt
+# are not reused
+PROMPT_VERSION = 1
+
+# Statuses worth retrying: rate limited or a temporary server failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def api_url() -> str:
+    """Endpoint to call: ENG_GEMINI_URL, GEMINI_API_URL in config.json
+    or the real API (the first two point tests at a local stub)."""
+    return (os.environ.get("ENG_GEMINI_URL")
+            or get_config().get("GEMINI_API_URL")
+            or API_URL)
+
+
+def build_prompt(word: str) -> str:
+    return f"""Create a concise English context sentence that demonstrates the meaning of the word '{word}'. 
+
+    Requirements:
+    - The sentence MUST contain the word '{word}' exactly as provided
+    - Keep the sentence short (45 characters maximum)
+    - The context should clearly illustrate the word's meaning through usage
+    - Use natural, everyday language
+    - Provide only the sentence, no additional explanation
+
+    Examples:
+    - Word: "apple" → "She bought a fresh apple from the local farmers market."
+    - Word: "innovation" → "The startup's innovation in AI technology impressed investors."
+    - Word: "navigate" → "He learned to navigate the complex subway system quickly."
+
+    Output format: Just the context sentence, nothing else."""
+
+
+def _request_body(word: str) -> dict:
+    return {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "text": build_prompt(word)
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def _extract_text(response_json: dict) -> Optional[str]:
+    if "candidates" in response_json and len(response_json["candidates"]) > 0:
+        candidate = response_json["candidates"][0]
+        if "content" in candidate and "parts" in \
+            candidate["content"] and len(candidate["content"]["parts"]) > 0:
+            return candidate["content"]["parts"][0]["text"].strip()
+    return None
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def generate_contexts(
+        words: Iterable[Tuple[int, str]], api_key: str, workers: int = 4,
+        rate: float = 5.0, retries: int = 5,
+        timeout: int = 10) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """Yields (uniq_id, word, context) for every (uniq_id, word) pair, in
+    completion order (the same word may come from several decks).
+
+    words is consumed lazily, a few ahead of the requests in flight, so
+    it can be a generator over the database. Up to `workers` requests
+    run at once and no more than `rate` start per
+    second. Rate limited (429) and 5xx answers, timeouts and dropped
+    connections are retried with exponential backoff and jitter; the
+    context is None once the retries run out or on any other error,
+    an answer of an unexpected shape included."""
+    import requests
+
+    limiter = RateLimiter(rate)
+    local = threading.local()
+    headers = {
+        "Content-Type": "application/json",
+        "X-goog-api-key": api_key
+    }
+    url = api_url()
+
+    def fetch(uniq_id: int, word: str) -> Tuple[int, str, Optional[str]]:
+        # One keep-alive session per thread: no TLS handshake per word
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        delay = 1.0
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                response = session.post(
+                    url, headers=headers, json=_request_body(word),
+                    timeout=timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return uniq_id, word, _extract_text(response.json())
+                # Honour Retry-After when the server sends one
+                retry_after = response.headers.get("Retry-After", "")
+                wait = float(retry_after) if retry_after.isdigit() else delay
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError):
+                wait = delay
+            except (requests.exceptions.RequestException, ValueError,
+                    KeyError, IndexError, TypeError, AttributeError):
+                return uniq_id, word, None
+            if attempt < retries:
+                time.sleep(wait * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, 60.0)
+        return uniq_id, word, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for uniq_id, word in words:
+            pending.add(pool.submit(fetch, uniq_id, word))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
@@ -1,10 +1,41 @@
 #!/usr/bin/python3 -q
 import sys
-from auxiliary import *
-from argumparse import *
 
 def main():
     args = sys.argv[1:]
+    # Tab-completion lookups read the word index only (see completion.py)
+    if args[:1] == ["--complete"]:
+        from completion import complete_main
+        complete_main(args[1:])
+        return
+    # `eng --profile [--pstats FILE] ...` or ENG_TRACE=1: time the phases
+    # of the command; nothing is instrumented otherwise
+    from settings import env_flag
+    pstats_path = None
+    if args[:1] == ["--profile"]:
+        args = args[1:]
+        if args[:1] == ["--pstats"] and len(args) > 1:
+            pstats_path, args = args[1], args[2:]
+    elif not env_flag("ENG_TRACE"):
+        run(args)
+        return
+    from profiling import run_profiled
+    run_profiled(args, pstats_path)
+
+
+def run(args):
+    # With daemon mode on, quick actions run in the resident process;
+    # daemon.py (socket, json) is imported only then
+    from constants import FORWARDED
+    from settings import daemon_enabled
+    if args[:1] == ["--deck"]:
+        args = args[2:] + args[:2]  # parse_args takes --deck anywhere
+    if args and args[0] in FORWARDED and daemon_enabled():
+        from daemon import forward
+        status = forward(args)
+        if status is not None:
+            sys.exit(status)
+    from argumparse import parse_args
     parse_args(args)
 
 if __name__ == "__main__":
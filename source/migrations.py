@@ -0,0 +1,548 @@
+import sqlite3
+from typing import Callable, List, Optional
+
+# Schema migrations. The index of a step in MIGRATIONS + 1 is the schema
+# version it produces; the applied version is kept in PRAGMA user_version.
+# Never edit or reorder an existing step, only append new ones.
+
+
+def _create_dict(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dict (
+            uniq_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+            english  TEXT,
+            otherlg  TEXT,  --other language you use
+            context  TEXT
+        );
+        """
+    )
+
+
+def _unique_english(conn: sqlite3.Connection) -> None:
+    # Old databases may hold duplicates: keep the first entry of every word,
+    # borrowing a context from a later duplicate if the first has none
+    conn.execute(
+        """
+        UPDATE dict
+        SET context = (
+            SELECT d.context FROM dict AS d
+            WHERE d.english = dict.english AND d.context IS NOT NULL
+            ORDER BY d.uniq_id LIMIT 1)
+        WHERE context IS NULL
+          AND uniq_id IN (SELECT MIN(uniq_id) FROM dict GROUP BY english
+                          HAVING COUNT(*) > 1)
+        """
+    )
+    conn.execute(
+        """
+        DELETE FROM dict
+        WHERE english IS NOT NULL
+          AND uniq_id NOT IN (SELECT MIN(uniq_id) FROM dict GROUP BY english)
+        """
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_dict_english ON dict(english)")
+
+
+def _dict_stats(conn: sqlite3.Connection) -> None:
+    # Row count and longest english/otherlg kept up to date by triggers,
+    # so startup reads one row instead of scanning the whole table.
+    # A delete (or shortening update) of the longest word cannot know the
+    # next maximum cheaply, it only marks the row stale for a recompute.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dict_stats (
+            id           INTEGER PRIMARY KEY CHECK (id = 1),
+            num_entries  INTEGER NOT NULL,
+            max_english  INTEGER NOT NULL,
+            max_otherlg  INTEGER NOT NULL,
+            stale        INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO dict_stats
+            (id, num_entries, max_english, max_otherlg, stale)
+        SELECT 1, COUNT(*),
+               IFNULL(MAX(LENGTH(english)), 0),
+               IFNULL(MAX(LENGTH(otherlg)), 0), 0
+        FROM dict
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_stats_insert AFTER INSERT ON dict
+        BEGIN
+            UPDATE dict_stats SET
+                num_entries = num_entries + 1,
+                max_english = MAX(max_english, IFNULL(LENGTH(new.english), 0)),
+                max_otherlg = MAX(max_otherlg, IFNULL(LENGTH(new.otherlg), 0))
+            WHERE id = 1;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_stats_delete AFTER DELETE ON dict
+        BEGIN
+            UPDATE dict_stats SET
+                num_entries = num_entries - 1,
+                stale = stale
+                    OR IFNULL(LENGTH(old.english), 0) >= max_english
+                    OR IFNULL(LENGTH(old.otherlg), 0) >= max_otherlg
+            WHERE id = 1;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_stats_update
+        AFTER UPDATE OF english, otherlg ON dict
+        BEGIN
+            UPDATE dict_stats SET
+                max_english = MAX(max_english, IFNULL(LENGTH(new.english), 0)),
+                max_otherlg = MAX(max_otherlg, IFNULL(LENGTH(new.otherlg), 0)),
+                stale = stale
+                    OR (IFNULL(LENGTH(old.english), 0) >= max_english
+                        AND IFNULL(LENGTH(new.english), 0)
+                            < IFNULL(LENGTH(old.english), 0))
+                    OR (IFNULL(LENGTH(old.otherlg), 0) >= max_otherlg
+                        AND IFNULL(LENGTH(new.otherlg), 0)
+                            < IFNULL(LENGTH(old.otherlg), 0))
+            WHERE id = 1;
+        END
+        """
+    )
+
+
+def fts5_available(conn: sqlite3.Connection,
+                   tokenize: str = "unicode61") -> bool:
+    """Whether this SQLite build has FTS5 with the tokenize tokenizer
+    (trigram, for one, needs SQLite 3.34)."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe "
+                     f"USING fts5(x, tokenize = '{tokenize}')")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _full_text_index(conn: sqlite3.Connection) -> None:
+    # External-content FTS5 index over all three text columns of dict.
+    # It stores only the index, the text itself stays in dict.
+    if not fts5_available(conn):
+        return  # the SQLite build lacks FTS5: full-text search is disabled
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS dict_fts USING fts5(
+            english, otherlg, context,
+            content = 'dict', content_rowid = 'uniq_id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_fts_insert AFTER INSERT ON dict
+        BEGIN
+            INSERT INTO dict_fts (rowid, english, otherlg, context)
+            VALUES (new.uniq_id, new.english, new.otherlg, new.context);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_fts_delete AFTER DELETE ON dict
+        BEGIN
+            INSERT INTO dict_fts (dict_fts, rowid, english, otherlg, context)
+            VALUES ('delete', old.uniq_id, old.english, old.otherlg, old.context);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_fts_update
+        AFTER UPDATE OF english, otherlg, context ON dict
+        BEGIN
+            INSERT INTO dict_fts (dict_fts, rowid, english, otherlg, context)
+            VALUES ('delete', old.uniq_id, old.english, old.otherlg, old.context);
+            INSERT INTO dict_fts (rowid, english, otherlg, context)
+            VALUES (new.uniq_id, new.english, new.otherlg, new.context);
+        END
+        """
+    )
+    conn.execute("INSERT INTO dict_fts (dict_fts) VALUES ('rebuild')")
+
+
+def _trigram_index(conn: sqlite3.Connection) -> None:
+    # Trigram index over english and otherlg for typo-tolerant lookup,
+    # plus a vocabulary view of it to know how common every trigram is
+    if not fts5_available(conn, "trigram"):
+        return  # no FTS5 or an older SQLite: fuzzy search is disabled
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS dict_trigram USING fts5(
+            english, otherlg,
+            content = 'dict', content_rowid = 'uniq_id',
+            tokenize = 'trigram'
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS dict_trigram_vocab
+        USING fts5vocab(dict_trigram, row)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_trigram_insert AFTER INSERT ON dict
+        BEGIN
+            INSERT INTO dict_trigram (rowid, english, otherlg)
+            VALUES (new.uniq_id, new.english, new.otherlg);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_trigram_delete AFTER DELETE ON dict
+        BEGIN
+            INSERT INTO dict_trigram (dict_trigram, rowid, english, otherlg)
+            VALUES ('delete', old.uniq_id, old.english, old.otherlg);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS dict_trigram_update
+        AFTER UPDATE OF english, otherlg ON dict
+        BEGIN
+            INSERT INTO dict_trigram (dict_trigram, rowid, english, otherlg)
+            VALUES ('delete', old.uniq_id, old.english, old.otherlg);
+            INSERT INTO dict_trigram (rowid, english, otherlg)
+            VALUES (new.uniq_id, new.english, new.otherlg);
+        END
+        """
+    )
+    conn.execute("INSERT INTO dict_trigram (dict_trigram) VALUES ('rebuild')")
+
+
+def _schedule_columns(conn: sqlite3.Connection) -> None:
+    # Spaced repetition state of every word (see scheduler.py); due = 0
+    # marks a new word. The index lets training read only the due words.
+    conn.execute(
+        "ALTER TABLE dict ADD COLUMN interval_days REAL NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE dict ADD COLUMN ease REAL NOT NULL DEFAULT 2.5")
+    conn.execute("ALTER TABLE dict ADD COLUMN reps INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE dict ADD COLUMN due INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dict_due ON dict(due)")
+
+
+def _review_log(conn: sqlite3.Connection) -> None:
+    # One row per training answer; latency is the time taken to answer
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS review_log (
+            id           INTEGER PRIMARY KEY,
+            word_id      INTEGER NOT NULL,
+            reviewed_at  REAL    NOT NULL,
+            correct      INTEGER NOT NULL,
+            grade        INTEGER NOT NULL,
+            latency_ms   INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_review_log_word
+        ON review_log(word_id, reviewed_at)
+        """
+    )
+
+
+def _ai_cache(conn: sqlite3.Connection) -> None:
+    # Gemini contexts by word, model and prompt version, with hit/miss counters
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_cache (
+            word            TEXT    NOT NULL,
+            model           TEXT    NOT NULL,
+            prompt_version  INTEGER NOT NULL,
+            context         TEXT    NOT NULL,
+            created_at      REAL    NOT NULL,
+            last_used       REAL    NOT NULL,
+            PRIMARY KEY (word, model, prompt_version)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache(last_used)")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_cache_stats (
+            id      INTEGER PRIMARY KEY CHECK (id = 1),
+            hits    INTEGER NOT NULL DEFAULT 0,
+            misses  INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO ai_cache_stats (id) VALUES (1)")
+
+
+def _ai_queue(conn: sqlite3.Connection) -> None:
+    # Words waiting for an AI context, filled in by the background worker
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ai_queue (
+            word_id   INTEGER PRIMARY KEY,
+            attempts  INTEGER NOT NULL DEFAULT 0,
+            next_try  REAL    NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ai_queue_next_try ON ai_queue(next_try)")
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS ai_queue_after_delete
+        AFTER DELETE ON dict
+        BEGIN
+            DELETE FROM ai_queue WHERE word_id = old.uniq_id;
+        END
+        """
+    )
+
+
+def _decks(conn: sqlite3.Connection) -> None:
+    # Words belong to a deck, deck 1 ("default") holds the existing ones.
+    # English is unique within a deck, and every deck query starts with
+    # deck_id in its index, so it reads that deck only.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS decks (
+            id    INTEGER PRIMARY KEY,
+            name  TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO decks (id, name) VALUES (1, 'default')")
+    conn.execute("ALTER TABLE dict ADD COLUMN deck_id INTEGER NOT NULL DEFAULT 1")
+    conn.execute("DROP INDEX IF EXISTS idx_dict_english")
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_dict_deck_english
+        ON dict(deck_id, english)
+        """
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_dict_due")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dict_deck_due ON dict(deck_id, due)")
+
+    # dict_stats becomes one row per deck, same triggers keyed by deck_id
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS dict_stats_{trigger}")
+    conn.execute("DROP TABLE IF EXISTS dict_stats")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS deck_stats (
+            deck_id      INTEGER PRIMARY KEY,
+            num_entries  INTEGER NOT NULL DEFAULT 0,
+            max_english  INTEGER NOT NULL DEFAULT 0,
+            max_otherlg  INTEGER NOT NULL DEFAULT 0,
+            stale        INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO deck_stats
+            (deck_id, num_entries, max_english, max_otherlg)
+        SELECT decks.id, COUNT(dict.uniq_id),
+               IFNULL(MAX(LENGTH(dict.english)), 0),
+               IFNULL(MAX(LENGTH(dict.otherlg)), 0)
+        FROM decks LEFT JOIN dict ON dict.deck_id = decks.id
+        GROUP BY decks.id
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS decks_after_insert AFTER INSERT ON decks
+        BEGIN
+            INSERT OR IGNORE INTO deck_stats (deck_id) VALUES (new.id);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS deck_stats_insert AFTER INSERT ON dict
+        BEGIN
+            UPDATE deck_stats SET
+                num_entries = num_entries + 1,
+                max_english = MAX(max_english, IFNULL(LENGTH(new.english), 0)),
+                max_otherlg = MAX(max_otherlg, IFNULL(LENGTH(new.otherlg), 0))
+            WHERE deck_id = new.deck_id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS deck_stats_delete AFTER DELETE ON dict
+        BEGIN
+            UPDATE deck_stats SET
+                num_entries = num_entries - 1,
+                stale = stale
+                    OR IFNULL(LENGTH(old.english), 0) >= max_english
+                    OR IFNULL(LENGTH(old.otherlg), 0) >= max_otherlg
+            WHERE deck_id = old.deck_id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS deck_stats_update
+        AFTER UPDATE OF english, otherlg ON dict
+        BEGIN
+            UPDATE deck_stats SET
+                max_english = MAX(max_english, IFNULL(LENGTH(new.english), 0)),
+                max_otherlg = MAX(max_otherlg, IFNULL(LENGTH(new.otherlg), 0)),
+                stale = stale
+                    OR (IFNULL(LENGTH(old.english), 0) >= max_english
+                        AND IFNULL(LENGTH(new.english), 0)
+                            < IFNULL(LENGTH(old.english), 0))
+                    OR (IFNULL(LENGTH(old.otherlg), 0) >= max_otherlg
+                        AND IFNULL(LENGTH(new.otherlg), 0)
+                            < IFNULL(LENGTH(old.otherlg), 0))
+            WHERE deck_id = new.deck_id;
+        END
+        """
+    )
+
+
+def casefold(text: Optional[str]) -> Optional[str]:
+    """The value of the *_cf column of a text (full Unicode case folding,
+    which SQLite's NOCASE and lower() do only for ASCII)."""
+    return text.casefold() if text is not None else None
+
+
+def _casefold_columns(conn: sqlite3.Connection) -> None:
+    # Case-folded copies of english and otherlg, written by VocabularyDB
+    # next to the originals (not by triggers: those would need a Python
+    # function in every program that writes the file). Prefix searches
+    # become range scans of these indexes, in either direction.
+    conn.execute("ALTER TABLE dict ADD COLUMN english_cf TEXT")
+    conn.execute("ALTER TABLE dict ADD COLUMN otherlg_cf TEXT")
+    conn.create_function("casefold", 1, casefold, deterministic=True)
+    conn.execute(
+        "UPDATE dict SET english_cf = casefold(english), "
+        "otherlg_cf = casefold(otherlg)")
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_dict_deck_english_cf
+        ON dict(deck_id, english_cf)
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_dict_deck_otherlg_cf
+        ON dict(deck_id, otherlg_cf)
+        """
+    )
+
+
+def _ai_cache_entries(conn: sqlite3.Connection) -> None:
+    # Number of ai_cache rows kept by triggers, so evicting the least
+    # recently used entries does not count the table on every write.
+    # ai_cache is written with upserts: a replaced entry fires neither.
+    conn.execute(
+        "ALTER TABLE ai_cache_stats ADD COLUMN entries INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        "UPDATE ai_cache_stats SET entries = (SELECT COUNT(*) FROM ai_cache)")
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS ai_cache_after_insert
+        AFTER INSERT ON ai_cache
+        BEGIN
+            UPDATE ai_cache_stats SET entries = entries + 1 WHERE id = 1;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS ai_cache_after_delete
+        AFTER DELETE ON ai_cache
+        BEGIN
+            UPDATE ai_cache_stats SET entries = entries - 1 WHERE id = 1;
+        END
+        """
+    )
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _create_dict,
+    _unique_english,
+    _dict_stats,
+    _full_text_index,
+    _trigram_index,
+    _schedule_columns,
+    _review_log,
+    _ai_cache,
+    _ai_queue,
+    _decks,
+    _casefold_columns,
+    _ai_cache_entries,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Steps that create nothing when the SQLite build lacks FTS5 or the
+# tokenizer they need, by the table they create. Such a step stays
+# pending: migrate() runs it again once a later build supports it.
+SEARCH_INDEXES = {
+    "dict_fts": ("unicode61", _full_text_index),
+    "dict_trigram": ("trigram", _trigram_index),
+}
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Brings the database schema up to SCHEMA_VERSION, returns the version."""
+    if get_version(conn) >= SCHEMA_VERSION:
+        _create_skipped_indexes(conn)
+        return get_version(conn)
+
+    # IMMEDIATE takes the write lock up front, so two processes
+    # starting at once do not both run the same step
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = get_version(conn)
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return get_version(conn)
+
+
+def _create_skipped_indexes(conn: sqlite3.Connection) -> None:
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('dict_fts', 'dict_trigram')")}
+    steps = [step for table, (tokenize, step) in SEARCH_INDEXES.items()
+             if table not in existing and fts5_available(conn, tokenize)]
+    if not steps:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for step in steps:
+            step(conn)  # IF NOT EXISTS: another process may have won
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
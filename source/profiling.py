@@ -0,0 +1,308 @@
+import os
+import sys
+import time
+import sqlite3
+import builtins
+import functools
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+# `eng --profile ...` / ENG_TRACE=1: where does the time of one command go.
+# Nothing in the program is instrumented in advance. When profiling is on,
+# the import machinery, VocabularyDB, the config loader, rendering, HTTP
+# and sqlite3.connect are wrapped as their modules get imported, so a
+# normal run does not pay for any of it.
+
+SQL_TEXT_WIDTH = 90
+
+
+class Tracer:
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+        self.started = time.perf_counter()
+        # phase -> [calls, total seconds, max seconds]
+        self.phases: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self.statements: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self.slow: List[tuple] = []
+        self.traced = 0  # statements SQLite ran, triggers included
+        self._import = builtins.__import__
+        self._depth = 0
+        self._instrumented = set()
+
+    # --- bookkeeping ---
+
+    def add(self, phase: str, seconds: float) -> None:
+        entry = self.phases[phase]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def add_sql(self, sql: str, seconds: float, conn=None,
+                params=None) -> None:
+        entry = self.statements[" ".join(sql.split())]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        self.add("sql", seconds)
+        if seconds * 1000 >= self.slow_ms:
+            self.slow.append((seconds, sql, self._plan(conn, sql, params)))
+
+    @staticmethod
+    def _plan(conn, sql: str, params) -> List[str]:
+        if conn is None:
+            return []
+        try:
+            # A plain cursor: the plan query itself is not timed
+            rows = conn.cursor(_PlainCursor).execute(
+                f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+            return [row[3] for row in rows]
+        except Exception:
+            return []  # not explainable (PRAGMA, BEGIN...) or bad params
+
+    def timed(self, phase: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+        return wrapper
+
+    # --- instrumentation ---
+
+    def install(self) -> None:
+        builtins.__import__ = self._timed_import
+        for name in list(INSTRUMENT):
+            if name in sys.modules:
+                self._instrument(name)
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(),
+                      level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                # Nested imports are part of the outermost one
+                self.add("import", time.perf_counter() - start)
+            if name in INSTRUMENT and name in sys.modules:
+                self._instrument(name)
+
+    def _instrument(self, name: str) -> None:
+        if name not in self._instrumented:
+            self._instrumented.add(name)
+            INSTRUMENT[name](self, sys.modules[name])
+
+    # --- output ---
+
+    def report(self, args: List[str], out=sys.stderr) -> None:
+        total = time.perf_counter() - self.started
+        print(f"\nProfile of `eng {' '.join(args)}`: {total * 1000:.1f} ms "
+              "since main() (phases nest: db.* include their sql)", file=out)
+        print(f"{'phase':<36} {'calls':>6} {'total ms':>10} {'max ms':>9}",
+              file=out)
+        for phase, (calls, seconds, longest) in sorted(
+                self.phases.items(), key=lambda item: -item[1][1]):
+            print(f"{phase:<36} {calls:>6} {seconds * 1000:>10.2f} "
+                  f"{longest * 1000:>9.2f}", file=out)
+
+        if self.statements:
+            print(f"\nSQL: {sum(s[0] for s in self.statements.values())} "
+                  f"calls from Python, {self.traced} statements run by "
+                  "SQLite (triggers, BEGIN/COMMIT included); slowest:",
+                  file=out)
+            print(f"{'total ms':>9} {'calls':>6}  statement", file=out)
+            for sql, (calls, seconds, _) in sorted(
+                    self.statements.items(), key=lambda item: -item[1][1])[:10]:
+                text = sql if len(sql) <= SQL_TEXT_WIDTH \
+                    else sql[:SQL_TEXT_WIDTH - 1] + "…"
+                print(f"{seconds * 1000:>9.2f} {calls:>6}  {text}", file=out)
+
+        if self.slow:
+            print(f"\nSlow statements (>= {self.slow_ms:g} ms) and their "
+                  "query plans:", file=out)
+            for seconds, sql, plan in self.slow:
+                print(f"{seconds * 1000:>9.2f} ms  {' '.join(sql.split())}",
+                      file=out)
+                for step in plan:
+                    print(f"{'':>14}{step}", file=out)
+
+
+# --- SQLite: timed connections and cursors ---
+
+_PlainCursor = sqlite3.Cursor
+
+
+class _TimedCursor(sqlite3.Cursor):
+    # Statement time = execute() plus every fetch of its rows, since
+    # SQLite produces the rows lazily
+    tracer: Optional[Tracer] = None
+
+    def _begin(self, sql: str, params) -> None:
+        self._finish()
+        self._sql, self._params, self._spent = sql, params, 0.0
+
+    def _finish(self) -> None:
+        sql = getattr(self, "_sql", None)
+        if sql is not None:
+            self._sql = None
+            self.tracer.add_sql(sql, self._spent, self.connection,
+                                self._params)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._spent += time.perf_counter() - start
+
+    def execute(self, sql, params=()):
+        self._begin(sql, params)
+        self._timed(super().execute, sql, params)
+        if self.description is None:
+            self._finish()  # no rows to fetch
+        return self
+
+    def executemany(self, sql, seq):
+        self._begin(sql, None)
+        self._timed(super().executemany, sql, seq)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany,
+                           self.arraysize if size is None else size)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # conn.execute(...).fetchone() leaves its cursor unexhausted
+        self._finish()
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    # The C versions create their cursor without calling cursor()
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+
+def _instrument_sqlite(tracer: Tracer, module) -> None:
+    _TimedCursor.tracer = tracer
+    connect = module.connect
+
+    def timed_connect(*args, **kwargs):
+        kwargs.setdefault("factory", _TimedConnection)
+        conn = connect(*args, **kwargs)
+
+        def on_statement(sql: str) -> None:
+            tracer.traced += 1
+
+        conn.set_trace_callback(on_statement)
+        return conn
+
+    module.connect = tracer.timed("db.connect", timed_connect)
+
+
+def _instrument_db(tracer: Tracer, db_rule) -> None:
+    import inspect
+
+    cls = db_rule.VocabularyDB
+    for name, attr in list(vars(cls).items()):
+        if not callable(attr) or (name != "__init__" and name.startswith("_")):
+            continue
+        # Context managers only set up their block: timing them says nothing
+        if inspect.isgeneratorfunction(getattr(attr, "__wrapped__", attr)):
+            continue
+        setattr(cls, name, tracer.timed(f"db.{name}", attr))
+
+
+def _instrument_settings(tracer: Tracer, settings) -> None:
+    settings.load_config = tracer.timed("config", settings.load_config)
+
+
+def _instrument_render(tracer: Tracer, render) -> None:
+    render.write_lines = tracer.timed("render", render.write_lines)
+
+
+def _instrument_transfer(tracer: Tracer, transfer) -> None:
+    transfer.export_to = tracer.timed("render", transfer.export_to)
+
+
+def _instrument_requests(tracer: Tracer, requests) -> None:
+    requests.Session.request = tracer.timed("network",
+                                            requests.Session.request)
+
+
+INSTRUMENT: Dict[str, Callable] = {
+    "sqlite3": _instrument_sqlite,
+    "db_rule": _instrument_db,
+    "settings": _instrument_settings,
+    "render": _instrument_render,
+    "transfer": _instrument_transfer,
+    "requests": _instrument_requests,
+}
+
+
+def run_profiled(args: List[str], pstats_path: Optional[str] = None) -> None:
+    """Runs one command with the tracer (and cProfile) on, then reports."""
+    from constants import TRACE_SLOW_QUERY_MS
+
+    slow_ms = float(os.environ.get("ENG_TRACE_SLOW_MS", TRACE_SLOW_QUERY_MS))
+    pstats_path = pstats_path or os.environ.get("ENG_TRACE_PSTATS")
+    tracer = Tracer(slow_ms)
+    tracer.install()
+    profiler = None
+    if pstats_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        from argumparse import parse_args
+        parse_args(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(pstats_path)
+        tracer.uninstall()
+        sys.stdout.flush()
+        tracer.report(args)
+        if pstats_path:
+            print(f"cProfile data written to {pstats_path} "
+                  f"(python -m pstats {pstats_path})", file=sys.stderr)
@@ -0,0 +1,40 @@
+import io
+import os
+import sys
+from typing import IO, Iterable
+
+# Bulk terminal output. Lines are produced lazily and written to fd 1 in
+# large chunks instead of one (unbuffered) print call per fragment.
+
+WRITE_BUFFER = 1 << 20  # 1 MiB
+
+
+def open_stdout(buffer_size: int = WRITE_BUFFER) -> IO[str]:
+    """A text stream over fd 1 with a big buffer; closing it keeps fd 1 open."""
+    sys.stdout.flush()
+    raw = io.FileIO(sys.stdout.fileno(), "w", closefd=False)
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size),
+                            encoding="utf-8", newline="")
+
+
+def silence_stdout() -> None:
+    """The reader of a pipe (head, less...) has gone away.
+
+    Point fd 1 at /dev/null so the interpreter does not fail flushing
+    stdout again on exit, and let the caller stop quietly."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+
+
+def write_lines(lines: Iterable[str], buffer_size: int = 1 << 16) -> bool:
+    """Writes lines to stdout, returns False if the pipe was closed early."""
+    try:
+        with open_stdout(buffer_size) as out:
+            for line in lines:
+                out.write(line)
+                out.write("\n")
+    except BrokenPipeError:
+        silence_stdout()
+        return False
+    return True
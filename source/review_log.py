@@ -0,0 +1,55 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from scheduler import Schedule
+
+# Write-behind buffer for training answers. Every answer is queued in
+# memory and written together with the schedule changes in one batched
+# transaction every `flush_every` answers or `flush_seconds` seconds, and
+# on exit, so the question loop does not commit after each answer.
+
+
+class ReviewWriter:
+    def __init__(self, db, flush_every: int = 20,
+                 flush_seconds: float = 30.0):
+        self.db = db
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self._reviews: List[Tuple[int, float, int, int, int]] = []
+        # Only the latest schedule of a word matters
+        self._schedules: Dict[int, Schedule] = {}
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def record(self, word_id: int, correct: bool, grade: int,
+               latency: float, reviewed_at: Optional[float] = None,
+               schedule: Optional[Schedule] = None) -> None:
+        """Queues one answer (latency in seconds) and the new schedule."""
+        if reviewed_at is None:
+            reviewed_at = time.time()
+        self._reviews.append(
+            (word_id, reviewed_at, int(correct), grade, int(latency * 1000)))
+        if schedule is not None:
+            self._schedules[word_id] = schedule
+        if (len(self._reviews) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self) -> bool:
+        if not self._reviews and not self._schedules:
+            return True
+        result = self.db.record_reviews(self._reviews, self._schedules)
+        if result.success:
+            self._reviews = []
+            self._schedules = {}
+            self._last_flush = time.monotonic()
+        return result.success
+
+    def close(self) -> None:
+        if not self.flush():
+            print("Failed to save the training results.")
@@ -0,0 +1,131 @@
+import time
+import random
+from array import array
+from typing import Callable, Optional
+
+# Training picks the next word with probability proportional to
+#
+#     weight = (now - last_seen) * (errors + 1)      for seen words
+#     weight = UNSEEN_WEIGHT                          for words not shown yet
+#
+# The weights of all seen words grow with the clock, so they cannot simply
+# be stored. But the sum over any range splits into
+#
+#     now * sum(errors + 1) - sum(last_seen * (errors + 1)) + sum(unseen)
+#
+# and each of those three sums lives in its own Fenwick tree: an update
+# after an answer and a draw are both O(log n), whatever the clock says.
+# The trees are arrays of doubles, 8 bytes a node instead of a float object.
+
+UNSEEN_WEIGHT = 1000.0
+
+
+class WeightedSampler:
+    def __init__(self, size: int, rng: Optional[random.Random] = None,
+                 clock: Callable[[], float] = time.time):
+        self.size = size
+        self.rng = rng or random.Random()
+        self.clock = clock
+        # Times are kept relative to the start, small numbers keep precision
+        self.start = clock()
+
+        self._factor = array("d")   # errors + 1, 0 if unseen
+        self._seen_at = array("d")
+        self._build(size)
+
+    def _build(self, capacity: int) -> None:
+        # O(n) rebuild of the 1-based Fenwick trees; slots past self.size
+        # are spare room for append() and weigh nothing
+        self.capacity = capacity
+        zeros = array("d", bytes(8 * (capacity - len(self._factor))))
+        self._factor.extend(zeros)
+        self._seen_at.extend(zeros)
+        self._tree_factor = array("d", [0.0]) + self._factor
+        self._tree_product = array("d", [0.0]) + array("d", (
+            f * t for f, t in zip(self._factor, self._seen_at)))
+        self._tree_unseen = array("d", [0.0]) + array("d", (
+            UNSEEN_WEIGHT if i < self.size and f == 0.0 else 0.0
+            for i, f in enumerate(self._factor)))
+        for tree in (self._tree_factor, self._tree_product, self._tree_unseen):
+            for i in range(1, capacity + 1):
+                parent = i + (i & -i)
+                if parent <= capacity:
+                    tree[parent] += tree[i]
+
+        self._top = 1
+        while self._top * 2 <= capacity:
+            self._top *= 2
+
+    def append(self) -> int:
+        """Adds an unseen word, returns its index."""
+        if self.size == self.capacity:
+            self._build(max(1, self.capacity * 2))
+        index = self.size
+        self.size += 1
+        self._add(self._tree_unseen, index, UNSEEN_WEIGHT)
+        return index
+
+    def _add(self, tree: array, index: int, delta: float) -> None:
+        i = index + 1
+        while i <= self.capacity:
+            tree[i] += delta
+            i += i & -i
+
+    def update(self, index: int, errors: int,
+               seen_at: Optional[float] = None) -> None:
+        """Records that word `index` was just shown and has `errors` errors."""
+        if seen_at is None:
+            seen_at = self.clock()
+        seen_at -= self.start
+        old_factor = self._factor[index]
+        if old_factor == 0.0:
+            self._add(self._tree_unseen, index, -UNSEEN_WEIGHT)
+        factor = float(errors + 1)
+        self._add(self._tree_factor, index, factor - old_factor)
+        self._add(self._tree_product, index,
+                  factor * seen_at - old_factor * self._seen_at[index])
+        self._factor[index] = factor
+        self._seen_at[index] = seen_at
+
+    def weight(self, index: int, now: Optional[float] = None) -> float:
+        if self._factor[index] == 0.0:
+            return UNSEEN_WEIGHT
+        now = (self.clock() if now is None else now) - self.start
+        return max(0.0, (now - self._seen_at[index]) * self._factor[index])
+
+    def total(self, now: Optional[float] = None) -> float:
+        now = (self.clock() if now is None else now) - self.start
+        factor = product = unseen = 0.0
+        i = self.capacity
+        while i > 0:
+            factor += self._tree_factor[i]
+            product += self._tree_product[i]
+            unseen += self._tree_unseen[i]
+            i -= i & -i
+        return max(0.0, now * factor - product + unseen)
+
+    def draw(self, now: Optional[float] = None) -> int:
+        """Index of a random word, chosen proportionally to its weight."""
+        if self.size == 0:
+            raise IndexError("draw from an empty sampler")
+        now = self.clock() if now is None else now
+        total = self.total(now)
+        if total <= 0.0:
+            # Everything was seen this very instant: any word will do
+            return self.rng.randrange(self.size)
+
+        rel_now = now - self.start
+        remaining = self.rng.random() * total
+        pos = 0
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= self.capacity:
+                node = (rel_now * self._tree_factor[nxt]
+                        - self._tree_product[nxt] + self._tree_unseen[nxt])
+                if node <= remaining:
+                    remaining -= node
+                    pos = nxt
+            step //= 2
+        # Float rounding may walk past the last word with weight
+        return min(pos, self.size - 1)
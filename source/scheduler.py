@@ -0,0 +1,38 @@
+from typing import NamedTuple
+
+# SM-2 spaced repetition. Every word carries an interval (days), an ease
+# factor and a repetition counter; a review moves its due time forward.
+
+DAY = 86400
+RELEARN_DELAY = 600   # a missed word comes back in 10 minutes
+MIN_EASE = 1.3
+
+# Answer grades on the SM-2 0..5 scale
+EXACT = 5      # typed the whole translation
+PREFIX = 4     # typed a correct beginning of it
+WRONG = 1
+
+
+class Schedule(NamedTuple):
+    interval: float = 0.0   # days
+    ease: float = 2.5
+    reps: int = 0           # successful reviews in a row
+    due: int = 0            # unix time; 0 = new word, due right away
+
+
+def review(schedule: Schedule, grade: int, now: float) -> Schedule:
+    """The schedule of a word after an answer graded `grade`."""
+    ease = schedule.ease + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    ease = max(MIN_EASE, ease)
+
+    if grade < 3:
+        return Schedule(0.0, ease, 0, int(now + RELEARN_DELAY))
+
+    reps = schedule.reps + 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = round(schedule.interval * ease, 1)
+    return Schedule(interval, ease, reps, int(now + interval * DAY))
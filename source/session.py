@@ -0,0 +1,81 @@
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+from scheduler import Schedule
+
+# The words of a training session, one slot per word in parallel typed
+# arrays: the id, the schedule and the session counters are stored as
+# machine numbers, a few dozen bytes per word instead of a dict of boxed
+# values. The texts are not kept at all; the question loop reads them
+# from the database for the word being asked (VocabularyDB.get_card).
+# Membership is a bitmap over uniq_id, one bit per id up to the largest.
+# Slot numbers match the indexes of the WeightedSampler, both only grow.
+
+
+class TrainingSession:
+    __slots__ = ("ids", "interval", "ease", "reps", "due",
+                 "errors", "correct", "_members")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.interval = array("d")
+        self.ease = array("d")
+        self.reps = array("l")
+        self.due = array("q")
+        self.errors = array("l")
+        self.correct = array("l")
+        self._members = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, word_id: int) -> bool:
+        byte = word_id >> 3
+        return (byte < len(self._members)
+                and bool(self._members[byte] >> (word_id & 7) & 1))
+
+    def add(self, word_id: int, schedule: Schedule) -> Optional[int]:
+        """Adds a word, returns its slot (None if it is already in)."""
+        if word_id in self:
+            return None
+        byte = word_id >> 3
+        if byte >= len(self._members):
+            self._members.extend(bytes(max(byte + 1, 2 * len(self._members))
+                                       - len(self._members)))
+        self._members[byte] |= 1 << (word_id & 7)
+        self.ids.append(word_id)
+        self.interval.append(schedule.interval)
+        self.ease.append(schedule.ease)
+        self.reps.append(schedule.reps)
+        self.due.append(schedule.due)
+        self.errors.append(0)
+        self.correct.append(0)
+        return len(self.ids) - 1
+
+    def extend(self, cards: Iterable[tuple]) -> List[int]:
+        """Adds (uniq_id, interval, ease, reps, due) rows, returns the
+        slots of the words that were not in yet."""
+        slots = []
+        for word_id, *schedule in cards:
+            slot = self.add(word_id, Schedule(*schedule))
+            if slot is not None:
+                slots.append(slot)
+        return slots
+
+    def schedule(self, slot: int) -> Schedule:
+        return Schedule(self.interval[slot], self.ease[slot],
+                        self.reps[slot], self.due[slot])
+
+    def set_schedule(self, slot: int, schedule: Schedule) -> None:
+        (self.interval[slot], self.ease[slot],
+         self.reps[slot], self.due[slot]) = schedule
+
+    def totals(self) -> Tuple[int, int]:
+        """Correct and incorrect answers of the session."""
+        return sum(self.correct), sum(self.errors)
+
+    def hardest(self, count: int) -> List[Tuple[int, int]]:
+        """(uniq_id, errors) of the most missed words, most errors first."""
+        missed = [slot for slot, errors in enumerate(self.errors) if errors]
+        missed.sort(key=lambda slot: -self.errors[slot])
+        return [(self.ids[slot], self.errors[slot]) for slot in missed[:count]]
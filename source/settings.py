@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from constants import DB_NAME
+
+CONF_PATH = Path(
+    os.environ.get("ENG_CONFIG_PATH")
+    or Path(__file__).parent.parent / 'config.json')
+
+DB_PATH = Path(
+    os.environ.get("ENG_DB_PATH")
+    or Path(__file__).parent.parent / "database" / DB_NAME)
+
+DEFAULT_CONFIG = {
+    "AI_ASSIST_ENABLED": False,
+    "GOOGLE_GEMINI_API_KEY": ""
+}
+
+_config: Optional[Dict[str, Any]] = None
+
+
+# json is imported by the functions that need it: the completion lookup
+# reads DB_PATH from here and must stay fast
+
+
+def load_config():
+    import json
+    config_path = CONF_PATH
+    default_config = dict(DEFAULT_CONFIG)
+    
+    try:
+        with open(config_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Creating a file with default settings
+        try:
+            with open(config_path, 'w', encoding='utf-8') as file:
+                json.dump(default_config, file, indent=2, ensure_ascii=False)
+        except Exception:
+            pass  # We silently ignore file creation errors.
+        return default_config
+
+
+def save_config(config_data):
+    """Saving the configuration to a JSON file"""
+    import json
+    global _config
+    try:
+        with open(CONF_PATH, 'w', encoding='utf-8') as f:
+            json.dump(config_data, f, indent=2, ensure_ascii=False)
+        _config = None
+        return True
+    except Exception as e:
+        print(f"Error saving the configuration: {e}")
+        return False
+
+
+def get_config() -> Dict[str, Any]:
+    """Configuration read once per process, on first use."""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+
+def reset_config() -> None:
+    """Forgets the cached configuration; the next get_config() rereads it."""
+    global _config
+    _config = None
+
+
+def env_flag(name: str) -> Optional[bool]:
+    """An on/off environment variable, None when it is not set; empty,
+    0, false, no and off (in any case) mean off."""
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+
+def daemon_enabled() -> bool:
+    """Daemon mode: ENG_DAEMON if set, else DAEMON_ENABLED in the config."""
+    env = env_flag("ENG_DAEMON")
+    if env is not None:
+        return env
+    return bool(get_config().get("DAEMON_ENABLED"))
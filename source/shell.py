@@ -0,0 +1,150 @@
+import shlex
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# Many commands in one process: `eng --shell` reads them from the
+# terminal, `eng --batch FILE` from a file. Every line has the usual
+# command line syntax (`-n apple яблоко`, `-d pear`...) and runs through
+# parse_args against the same open database. A --deck given to the shell
+# or the batch applies to every line that has no --deck of its own.
+
+HISTORY_FILE = Path.home() / ".eng_history"
+HISTORY_LENGTH = 1000
+
+# Batch lines only change or read the dictionary: no terminal input and
+# no nested shells
+BATCH_ACTIONS = {"-n", "-d", "-e", "-s", "-r", "-f", "--fuzzy", "-l"}
+NESTED = {"--shell", "--batch", "--daemon"}
+
+
+def split_line(line: str) -> Optional[List[str]]:
+    """Arguments of one line, None for blank lines and # comments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    args = shlex.split(line)
+    if args and args[0] == "eng":
+        args = args[1:]  # lines copied from the terminal
+    return args or None
+
+
+def with_deck(args: List[str], deck: Optional[str]) -> List[str]:
+    from argumparse import DECK_ACTIONS
+
+    if deck is None or "--deck" in args or args[0] not in DECK_ACTIONS:
+        return args
+    return args + ["--deck", deck]
+
+
+def run_shell(deck: Optional[str] = None) -> None:
+    from argumparse import parse_args
+
+    try:
+        import readline
+    except ImportError:
+        readline = None  # no history, input() still works
+    if readline is not None:
+        try:
+            readline.read_history_file(HISTORY_FILE)
+        except OSError:
+            pass
+        readline.set_history_length(HISTORY_LENGTH)
+
+    print("English Vocabulary shell. Commands as on the command line "
+          "(-n, -d, -e, -s, -r, -f, -l, -t...), `help` for the list, "
+          "`--deck NAME` to switch decks, `exit` to leave.")
+    try:
+        while True:
+            try:
+                line = input(f"eng[{deck}]> " if deck else "eng> ")
+            except KeyboardInterrupt:
+                print()
+                continue
+            except EOFError:
+                print()
+                break
+            if line.strip() in ("exit", "quit"):
+                break
+            if line.strip() == "help":
+                line = "-h"
+            try:
+                args = split_line(line)
+            except ValueError as e:
+                print(f"Invalid line: {e}")
+                continue
+            if not args:
+                continue
+            if args[0] in NESTED:
+                print(f"{args[0]} cannot be used inside the shell.")
+                continue
+            if args[0] == "--deck" and len(args) == 2:
+                deck = args[1]
+                print(f"Commands now work on deck \'{deck}\'.")
+                continue
+            try:
+                parse_args(with_deck(args, deck))
+            except KeyboardInterrupt:
+                print("\nInterrupted.")
+    finally:
+        if readline is not None:
+            try:
+                readline.write_history_file(HISTORY_FILE)
+            except OSError:
+                pass
+
+
+def run_batch(path: str, commit_every: Optional[int] = None,
+              deck: Optional[str] = None) -> None:
+    """Runs the commands of a file (- for stdin) in one transaction.
+
+    With commit_every the work is committed every that many commands,
+    so an interrupted run keeps what was committed before."""
+    from argumparse import parse_args
+    from auxiliary import get_db, spawn_ai_worker
+    from settings import get_config
+    from transfer import open_input
+
+    db = get_db()
+    done = 0
+    started = time.perf_counter()
+    try:
+        with open_input(path) as file, db.transaction():
+            for lineno, args in _commands(file):
+                action = args[2:3] if args[0] == "--deck" else args[:1]
+                if not action or action[0] not in BATCH_ACTIONS:
+                    print(f"Line {lineno}: {' '.join(args[:3])} cannot be "
+                          "used in a batch, skipped.")
+                    continue
+                parse_args(with_deck(args, deck))
+                done += 1
+                if commit_every and done % commit_every == 0:
+                    db.commit()
+    except OSError as e:
+        print(f"Error reading \'{path}\': {e}")
+        return
+    except KeyboardInterrupt:
+        kept = done - done % commit_every if commit_every else 0
+        print(f"\nInterrupted: {done - kept} uncommitted commands "
+              "rolled back.")
+        return
+    finally:
+        # The -n lines only queued their AI contexts, now committed
+        if get_config().get("AI_ASSIST_ENABLED"):
+            queued = db.count_queued(now=time.time())
+            if queued.success and queued.data:
+                spawn_ai_worker()
+    elapsed = time.perf_counter() - started
+    print(f"Ran {done} commands in {elapsed:.2f}s "
+          f"({done / max(elapsed, 1e-9):,.0f} commands/s)")
+
+
+def _commands(lines: Iterable[str]):
+    for lineno, line in enumerate(lines, 1):
+        try:
+            args = split_line(line)
+        except ValueError as e:
+            print(f"Line {lineno}: {e}, skipped.")
+            continue
+        if args:
+            yield lineno, args
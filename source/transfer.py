@@ -0,0 +1,124 @@
+import io
+import os
+import csv
+import sys
+import json
+from render import open_stdout, WRITE_BUFFER
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Tuple
+
+# Import/export file formats. Every format carries the same three columns,
+# so whatever --export writes, --import reads back unchanged.
+
+FORMATS = ("csv", "tsv", "jsonl")
+COLUMNS = ("english", "otherlg", "context")
+
+Row = Tuple[str, str, Optional[str]]
+
+
+def detect_format(path: str, sample: str = "") -> str:
+    """Guesses the format by file extension, then by the first line."""
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in FORMATS:
+        return suffix
+    if suffix in ("ndjson", "json"):
+        return "jsonl"
+    if sample.lstrip().startswith("{"):
+        return "jsonl"
+    if "\t" in sample:
+        return "tsv"
+    return "csv"
+
+
+def open_input(path: str) -> IO[str]:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def _read_delimited(file: Iterable[str], delimiter: str) -> Iterator[Row]:
+    reader = csv.reader(file, delimiter=delimiter)
+    try:
+        for fields in reader:
+            if not fields:
+                continue
+            if tuple(f.strip().lower() for f in fields[:2]) == COLUMNS[:2]:
+                continue  # header line
+            english = fields[0].strip()
+            otherlg = fields[1].strip() if len(fields) > 1 else ""
+            context = fields[2].strip() if len(fields) > 2 else ""
+            yield english, otherlg, context or None
+    except csv.Error as e:
+        raise ValueError(f"line {reader.line_num}: {e}") from e
+
+
+def _read_jsonl(file: Iterable[str]) -> Iterator[Row]:
+    for line_num, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_num}: {e}") from e
+        if not isinstance(item, dict):
+            raise ValueError(f"line {line_num}: expected a JSON object")
+        yield (str(item.get("english") or "").strip(),
+               str(item.get("otherlg") or "").strip(),
+               item.get("context") or None)
+
+
+def read_rows(file: Iterable[str], fmt: str) -> Iterator[Row]:
+    """Streams rows from the lines of a file, one at a time."""
+    if fmt == "jsonl":
+        return _read_jsonl(file)
+    return _read_delimited(file, "\t" if fmt == "tsv" else ",")
+
+
+def open_output(path: str) -> IO[str]:
+    if path == "-":
+        return open_stdout()
+    return open(path, "w", encoding="utf-8", newline="",
+                buffering=WRITE_BUFFER)
+
+
+def write_rows(file: IO[str], rows: Iterable, fmt: str) -> int:
+    """Writes rows (anything indexable by column name) and returns the count."""
+    count = 0
+    if fmt == "jsonl":
+        for row in rows:
+            file.write(json.dumps(
+                {column: row[column] for column in COLUMNS},
+                ensure_ascii=False))
+            file.write("\n")
+            count += 1
+        return count
+
+    writer = csv.writer(file, delimiter="\t" if fmt == "tsv" else ",",
+                        lineterminator="\n")
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow((row["english"], row["otherlg"], row["context"] or ""))
+        count += 1
+    return count
+
+
+def export_to(path: str, rows: Iterable, fmt: str) -> int:
+    """Writes rows to path (or stdout for "-").
+
+    A file is written next to the target and renamed over it at the
+    end, so an interrupted backup never leaves a truncated file."""
+    if path == "-":
+        with open_output(path) as file:
+            return write_rows(file, rows, fmt)
+
+    tmp_path = f"{path}.part"
+    try:
+        with open_output(tmp_path) as file:
+            count = write_rows(file, rows, fmt)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
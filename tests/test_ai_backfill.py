@@ -0,0 +1,135 @@
+"""AI context generation against a local stub of the Gemini API."""
+import sys
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "source"))
+
+import auxiliary  # noqa: E402
+import settings  # noqa: E402
+from db_rule import VocabularyDB  # noqa: E402
+
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    words: list = []  # asked for, in order
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        word = body["contents"][0]["parts"][0]["text"].split("'")[1]
+        Stub.words.append(word)
+        # "odd" gets an answer of an unexpected shape
+        part = {} if word == "odd" else {"text": f"A sentence with {word}."}
+        payload = json.dumps({"candidates": [{"content": {
+            "parts": [part]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    Stub.words = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("ENG_GEMINI_URL", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(settings, "_config", {
+        "GOOGLE_GEMINI_API_KEY": "stub", "AI_CACHE_ENABLED": False})
+    db = VocabularyDB(str(tmp_path / "eng.db"))
+    monkeypatch.setattr(auxiliary, "_db", db)
+    yield db
+    db.close()
+    server.shutdown()
+    server.server_close()
+
+
+def add_to_two_decks(db: VocabularyDB, enqueue: bool) -> None:
+    # The same English word in two decks: two rows, one word
+    db.add_word("run", "бежать", enqueue_context=enqueue)
+    db.use_deck("sport", create=True)
+    db.add_word("run", "пробежка", enqueue_context=enqueue)
+    db.add_word("lap", "круг", enqueue_context=enqueue)
+    db.use_deck(None)
+
+
+def contexts(db: VocabularyDB) -> list:
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(
+            "SELECT english, context FROM dict ORDER BY uniq_id").fetchall()
+
+
+def test_backfill_word_in_two_decks(db):
+    add_to_two_decks(db, enqueue=False)
+    auxiliary.ai_backfill(workers=2)
+    assert contexts(db) == [("run", "A sentence with run."),
+                            ("run", "A sentence with run."),
+                            ("lap", "A sentence with lap.")]
+
+
+def test_worker_word_in_two_decks(db):
+    add_to_two_decks(db, enqueue=True)
+    assert auxiliary._drain_ai_queue(db, quiet=True, due_only=False) == (3, 0)
+    assert all(context for _, context in contexts(db))
+    assert db.count_queued().data == 0
+
+
+def test_malformed_answer_is_a_failure(db):
+    from gemini import generate_contexts
+
+    results = sorted(generate_contexts([(1, "odd"), (2, "fine")], "stub"))
+    assert results == [(1, "odd", None), (2, "fine", "A sentence with fine.")]
+
+
+def test_backfill_uses_cache(db, monkeypatch):
+    monkeypatch.setitem(settings._config, "AI_CACHE_ENABLED", True)
+    db.add_word("run", "бежать")
+    auxiliary.ai_backfill()
+    db.use_deck("sport", create=True)
+    db.add_word("run", "пробежка")
+    auxiliary.ai_backfill()
+    assert Stub.words == ["run"]
+    assert contexts(db) == [("run", "A sentence with run.")] * 2
+
+
+def test_worker_keeps_failed_words_queued(db):
+    db.add_word("odd", "странный", enqueue_context=True)
+    db.add_word("fine", "хорошо", enqueue_context=True)
+    assert auxiliary._drain_ai_queue(db, quiet=True, due_only=False) == (1, 1)
+    assert db.count_queued().data == 1
+    assert db.count_queued(now=0).data == 0  # backing off
+
+
+def test_cache_lookups_are_written_with_the_batch(db):
+    db.put_cached_contexts([("run", "Run.")], "m", 1, max_entries=10)
+    writes = db._conn.total_changes
+    assert db.get_cached_context("run", "m", 1, ttl_days=1).data == "Run."
+    assert db.get_cached_context("walk", "m", 1, ttl_days=1).data is None
+    assert db._conn.total_changes == writes
+    stats = db.get_context_cache_stats().data
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    db.put_cached_contexts([("walk", "Walk."), ("run", "Run!"), ("lap", "Lap.")],
+                           "m", 1, max_entries=2)
+    assert db.get_context_cache_stats().data == {
+        "entries": 2, "hits": 1, "misses": 1}
+    with sqlite3.connect(db.db_path) as conn:
+        assert conn.execute("SELECT hits, misses, entries FROM ai_cache_stats"
+                            ).fetchone() == (1, 1, 2)
+
+
+def test_counts_report_errors(db):
+    with db.get_connection() as conn:
+        conn.execute("DROP TABLE ai_queue")
+    result = db.count_queued(now=0)
+    assert not result.success and "ai_queue" in result.message
+    assert db.count_missing_context().data == 0
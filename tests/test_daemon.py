@@ -0,0 +1,75 @@
+"""The daemon's socket protocol and runtime directory."""
+import os
+import sys
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "source"))
+
+import daemon  # noqa: E402
+
+
+@pytest.fixture
+def fake_daemon(tmp_path, monkeypatch):
+    """A server answering every request with the bytes it is given."""
+    path = str(tmp_path / "eng.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    monkeypatch.setenv("ENG_SOCKET", path)
+    monkeypatch.setenv("ENG_DAEMON", "1")
+
+    def answer(reply: bytes) -> None:
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                conn.makefile("rb").readline()
+                conn.sendall(reply)
+        threading.Thread(target=serve, daemon=True).start()
+
+    yield answer
+    server.close()
+
+
+@pytest.mark.parametrize("reply, output, status", [
+    ("1 run - бег\n\x000\n".encode(), "1 run - бег\n".encode(), 0),
+    (b"Error: boom\n\x003\n", b"Error: boom\n", 3),
+    (b"\x000\n", b"", 0),
+    (b"cut short", b"cut short", 1),  # the daemon died mid-command
+])
+def test_forward_exit_status(fake_daemon, capsysbinary, reply, output, status):
+    fake_daemon(reply)
+    assert daemon.forward(["-s", "r"]) == status
+    assert capsysbinary.readouterr().out == output
+
+
+@pytest.mark.parametrize("error, status", [
+    (SystemExit(2), 2), (SystemExit("no database"), 1), (ValueError("x"), 1),
+])
+def test_run_reports_failures(error, status):
+    def parse_args(args):
+        print("partial output", flush=True)
+        raise error
+
+    server, client = socket.socketpair()
+    with server, client:
+        assert daemon._run(server, ["-s", "r"], parse_args) == status
+
+
+def test_runtime_dir_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    path = daemon._runtime_dir()
+    assert os.stat(path).st_mode & 0o777 == 0o700
+
+    os.chmod(path, 0o755)
+    with pytest.raises(OSError):
+        daemon._runtime_dir()
+    os.rmdir(path)
+    os.symlink(tmp_path, path)
+    with pytest.raises(OSError):
+        daemon._runtime_dir()
@@ -0,0 +1,64 @@
+"""Schema migrations on SQLite builds without parts of FTS5."""
+import sys
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "source"))
+
+import migrations  # noqa: E402
+from db_rule import VocabularyDB  # noqa: E402
+
+
+def tables(db: VocabularyDB) -> set:
+    with sqlite3.connect(db.db_path) as conn:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_without_trigram_tokenizer(tmp_path, monkeypatch):
+    # FTS5 of SQLite < 3.34: every other step still runs
+    probe = migrations.fts5_available
+    monkeypatch.setattr(
+        migrations, "fts5_available",
+        lambda conn, tokenize="unicode61":
+            tokenize != "trigram" and probe(conn, tokenize))
+    with VocabularyDB(str(tmp_path / "eng.db")) as db:
+        assert "dict_trigram" not in tables(db)
+        assert "dict_fts" in tables(db)
+        with db.get_connection() as conn:
+            assert migrations.get_version(conn) == migrations.SCHEMA_VERSION
+        assert db.use_deck("sport", create=True).success
+        assert db.add_word("run", "бежать").success
+        result = db.fuzzy_search("rnu")
+        assert not result.success and "3.34" in result.message
+
+
+def test_failed_migration_is_fatal(tmp_path, monkeypatch):
+    def broken(conn):
+        raise sqlite3.OperationalError("no such tokenizer: trigram")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS",
+                        migrations.MIGRATIONS[:4] + [broken]
+                        + migrations.MIGRATIONS[5:])
+    with pytest.raises(sqlite3.DatabaseError, match="trigram"):
+        VocabularyDB(str(tmp_path / "eng.db"))
+
+
+def test_search_indexes_created_once_fts5_is_there(tmp_path, monkeypatch):
+    path = str(tmp_path / "eng.db")
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "fts5_available", lambda *args: False)
+        with VocabularyDB(path) as db:
+            db.add_word("run", "бежать", "I run every morning.")
+            assert not {"dict_fts", "dict_trigram"} & tables(db)
+            result = db.full_text_search("morning")
+            assert not result.success and "not available" in result.message
+
+    # The same file opened by an SQLite with FTS5
+    with VocabularyDB(path) as db:
+        assert {"dict_fts", "dict_trigram"} <= tables(db)
+        assert [row["english"] for row in db.full_text_search("morning").data] \
+            == ["run"]
+        assert [m["english"] for m in db.fuzzy_search("runn").data] == ["run"]
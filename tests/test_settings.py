@@ -0,0 +1,26 @@
+"""On/off environment variables."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "source"))
+
+import settings  # noqa: E402
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("yes", True), ("on", True),
+    ("", False), ("0", False), ("false", False), ("No", False), (" OFF ", False),
+])
+def test_env_flag(monkeypatch, value, expected):
+    monkeypatch.setenv("ENG_DAEMON", value)
+    assert settings.env_flag("ENG_DAEMON") is expected
+    assert settings.daemon_enabled() is expected
+
+
+def test_env_flag_unset_falls_back_to_config(monkeypatch):
+    monkeypatch.delenv("ENG_DAEMON", raising=False)
+    monkeypatch.setattr(settings, "_config", {"DAEMON_ENABLED": True})
+    assert settings.env_flag("ENG_DAEMON") is None
+    assert settings.daemon_enabled() is True